@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+DOCUMENTATION = r'''
+---
+name: minio_profile
+type: aggregate
+short_description: Summarize the cost of minio_* tasks across a play
+description:
+    - Collects the duration of every task running a C(minio_*) module of this collection together with
+      the call metrics the module returns.
+    - At the end of the playbook it prints totals per module and per MinIO API operation,
+      the slowest tasks and entities, and the number of API calls per changed item.
+    - Optionally writes the same summary as JSON so converge cost can be tracked over time.
+requirements:
+    - enable in configuration, for example C(callbacks_enabled = ceesios.minio.minio_profile) in ansible.cfg
+options:
+    output_file:
+        description:
+            - Path of a JSON file to which the summary is written. Nothing is written when not set.
+        type: path
+        env:
+            - name: MINIO_PROFILE_OUTPUT
+        ini:
+            - section: callback_minio_profile
+              key: output_file
+    top:
+        description:
+            - Number of slowest tasks and entities to show.
+        type: int
+        default: 10
+        env:
+            - name: MINIO_PROFILE_TOP
+        ini:
+            - section: callback_minio_profile
+              key: top
+author:
+    - Cees Moerkerken (@ceesios)
+'''
+
+import json
+import time
+
+from ansible.plugins.callback import CallbackBase
+
+
+def _module_name(action):
+    # Accept both the short and the fully qualified module name
+    name = action.rsplit('.', 1)[-1]
+    return name if name.startswith('minio_') else None
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'ceesios.minio.minio_profile'
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+        self._task_started = {}
+        self._modules = {}
+        self._operations = {}
+        self._entities = {}
+        self._tasks = []
+
+    def v2_playbook_on_task_start(self, task, is_conditional):
+        self._task_started[task._uuid] = time.time()
+
+    def v2_playbook_on_handler_task_start(self, task):
+        self._task_started[task._uuid] = time.time()
+
+    def v2_runner_on_ok(self, result):
+        self._record(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._record(result)
+
+    def _record(self, result):
+        task = result._task
+        module_name = _module_name(task.action)
+        if module_name is None:
+            return
+
+        duration = time.time() - self._task_started.get(task._uuid, time.time())
+        data = result._result
+        # Loops report one result per item
+        items = data.get('results') if isinstance(data.get('results'), list) else [data]
+
+        module = self._modules.setdefault(module_name, {
+            'tasks': 0, 'seconds': 0.0, 'changed': 0, 'calls': 0,
+            'items': 0, 'changed_items': 0,
+        })
+        module['tasks'] += 1
+        module['seconds'] += duration
+        module['changed'] += int(bool(data.get('changed')))
+
+        calls = 0
+        for item in items:
+            metrics = item.get('metrics') if isinstance(item, dict) else None
+            if not metrics:
+                continue
+            module['items'] += metrics.get('items', 0)
+            module['changed_items'] += metrics.get('changed_items', 0)
+            for operation, call in metrics.get('calls', {}).items():
+                key = '%s.%s' % (module_name, operation)
+                total = self._operations.setdefault(key, {'count': 0, 'errors': 0, 'seconds': 0.0})
+                total['count'] += call.get('count', 0)
+                total['errors'] += call.get('errors', 0)
+                total['seconds'] += call.get('seconds', 0.0)
+                calls += call.get('count', 0)
+            for entity, seconds in metrics.get('entities', {}).items():
+                key = '%s:%s' % (module_name, entity)
+                self._entities[key] = self._entities.get(key, 0.0) + seconds
+        module['calls'] += calls
+
+        self._tasks.append({
+            'task': task.get_name(),
+            'host': result._host.get_name(),
+            'module': module_name,
+            'seconds': round(duration, 4),
+            'calls': calls,
+            'changed': bool(data.get('changed')),
+        })
+
+    def _summary(self):
+        top = self.get_option('top')
+        modules = {}
+        for name, module in sorted(self._modules.items()):
+            summary = dict(module)
+            summary['seconds'] = round(module['seconds'], 4)
+            summary['calls_per_changed_item'] = (
+                round(float(module['calls']) / module['changed_items'], 2) if module['changed_items'] else None)
+            modules[name] = summary
+        operations = dict(
+            (name, dict(op, seconds=round(op['seconds'], 4)))
+            for name, op in sorted(self._operations.items(), key=lambda item: -item[1]['seconds']))
+        entities = [
+            {'entity': name, 'seconds': round(seconds, 4)}
+            for name, seconds in sorted(self._entities.items(), key=lambda item: -item[1])[:top]]
+        tasks = sorted(self._tasks, key=lambda task: -task['seconds'])[:top]
+        return {
+            'modules': modules,
+            'operations': operations,
+            'slowest_entities': entities,
+            'slowest_tasks': tasks,
+        }
+
+    def v2_playbook_on_stats(self, stats):
+        if not self._modules:
+            return
+        summary = self._summary()
+
+        self._display.banner('MINIO PROFILE')
+        self._display.display('Per module:')
+        for name, module in summary['modules'].items():
+            per_item = module['calls_per_changed_item']
+            self._display.display(
+                '  %-20s tasks=%-5d %9.2fs calls=%-7d items=%-7d changed_items=%-7d calls/changed=%s' % (
+                    name, module['tasks'], module['seconds'], module['calls'], module['items'],
+                    module['changed_items'], '-' if per_item is None else per_item))
+        self._display.display('Per API operation:')
+        for name, op in summary['operations'].items():
+            self._display.display('  %-40s count=%-7d errors=%-5d %9.2fs' % (
+                name, op['count'], op['errors'], op['seconds']))
+        if summary['slowest_entities']:
+            self._display.display('Slowest entities:')
+            for entity in summary['slowest_entities']:
+                self._display.display('  %-50s %9.2fs' % (entity['entity'], entity['seconds']))
+        self._display.display('Slowest tasks:')
+        for task in summary['slowest_tasks']:
+            self._display.display('  %-50s %-20s %9.2fs calls=%d' % (
+                task['task'], task['host'], task['seconds'], task['calls']))
+
+        output_file = self.get_option('output_file')
+        if output_file:
+            summary['generated_at'] = time.time()
+            with open(output_file, 'w') as f:
+                json.dump(summary, f, indent=2, sort_keys=True)
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# Classification of MinIO admin and S3 errors.
+#
+# MinioAdminException only carries the HTTP status and the raw response
+# body. The body is parsed once into a typed error code, so modules no
+# longer search the body for substrings to find out whether an entity
+# exists.
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+
+NO_SUCH_USER = 'XMinioAdminNoSuchUser'
+NO_SUCH_GROUP = 'XMinioAdminNoSuchGroup'
+NO_SUCH_POLICY = 'XMinioAdminNoSuchPolicy'
+NO_SUCH_SERVICE_ACCOUNT = 'XMinioAdminServiceAccountNotFound'
+NO_SUCH_BUCKET = 'NoSuchBucket'
+NO_SUCH_QUOTA = 'XMinioAdminNoSuchQuotaConfiguration'
+
+NOT_FOUND_CODES = frozenset([
+    NO_SUCH_USER,
+    NO_SUCH_GROUP,
+    NO_SUCH_POLICY,
+    NO_SUCH_SERVICE_ACCOUNT,
+    NO_SUCH_BUCKET,
+    NO_SUCH_QUOTA,
+])
+
+
+class MinioError:
+    """Error code, HTTP status and message of a failed MinIO request."""
+
+    __slots__ = ('code', 'status', 'message')
+
+    def __init__(self, code, status, message):
+        self.code = code
+        self.status = status
+        self.message = message
+
+    @property
+    def not_found(self):
+        return self.code in NOT_FOUND_CODES
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(exc):
+    """
+    Return the MinioError of an exception raised by the minio clients.
+    The result is cached on the exception so repeated checks are free.
+    """
+    cached = getattr(exc, '_minio_error', None)
+    if cached is not None:
+        return cached
+
+    if hasattr(exc, '_body'):
+        # MinioAdminException: status code and JSON body such as
+        # {"Code": "XMinioAdminNoSuchUser", "Message": "..."}
+        code = None
+        message = exc._body
+        try:
+            body = json.loads(exc._body)
+            if isinstance(body, dict):
+                code = body.get('Code')
+                message = body.get('Message', message)
+        except (TypeError, ValueError):
+            pass
+        error = MinioError(code, _to_int(exc._code), message)
+    elif hasattr(exc, 'code') and hasattr(exc, 'response'):
+        # S3Error
+        error = MinioError(exc.code, _to_int(getattr(exc.response, 'status', None)), getattr(exc, 'message', str(exc)))
+    else:
+        error = MinioError(None, None, str(exc))
+
+    try:
+        exc._minio_error = error
+    except AttributeError:
+        pass
+    return error
+
+
+def is_not_found(exc, code=None):
+    """True when exc reports a missing entity, optionally of a specific code."""
+    error = classify(exc)
+    if code is not None:
+        return error.code == code
+    return error.not_found
+
+
+def error_details(exc):
+    """Keyword arguments for fail_json describing exc."""
+    error = classify(exc)
+    return dict(error_code=error.code, status_code=error.status)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+# Call metrics for the MinIO clients used by the modules.
+#
+# Every module wraps its clients with MetricsRecorder.wrap() and returns
+# the recorded data as result['metrics']. The minio_profile callback plugin
+# aggregates these metrics across a play.
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import threading
+import time
+
+# Number of slowest entities kept per task
+MAX_ENTITIES = 20
+
+# S3 calls on a single object, called with (bucket_name, object_name, ...)
+OBJECT_OPERATIONS = frozenset([
+    'get_object_retention', 'set_object_retention', 'is_object_legal_hold_enabled',
+    'enable_object_legal_hold', 'disable_object_legal_hold', 'stat_object',
+    'get_object_tags', 'set_object_tags', 'delete_object_tags', 'remove_object',
+])
+
+
+def call_entity(operation, args, kwargs):
+    """
+    Name of the entity a client call works on: bucket/object for object
+    calls, the access key for the keyword-only service account calls and
+    otherwise the first positional argument (user, group, policy or bucket).
+    """
+    if operation in OBJECT_OPERATIONS and len(args) >= 2:
+        return '%s/%s' % (args[0], args[1])
+    if not args and (kwargs.get('access_key') or kwargs.get('name')):
+        return kwargs.get('access_key') or kwargs.get('name')
+    if args and isinstance(args[0], str):
+        return args[0]
+    return None
+
+
+class MetricsRecorder:
+    """
+    Thread-safe counters of client calls per API operation and of the time
+    spent per entity (user, group, policy, bucket or object name).
+
+    data is updated in place, so it can be put in the module result right
+    away and is complete whenever exit_json or fail_json is called.
+    """
+
+    def __init__(self, module_name):
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self.data = {
+            'module': module_name,
+            'elapsed': 0.0,
+            'calls': {},
+            'entities': {},
+            'items': 0,
+            'changed_items': 0,
+        }
+
+    def wrap(self, client):
+        return _RecordingClient(client, self)
+
+    def set_items(self, items, changed_items):
+        self.data['items'] = items
+        self.data['changed_items'] = changed_items
+        self.data['elapsed'] = round(time.time() - self._started, 4)
+
+    def record(self, operation, entity, seconds, failed):
+        with self._lock:
+            call = self.data['calls'].setdefault(operation, {'count': 0, 'errors': 0, 'seconds': 0.0})
+            call['count'] += 1
+            call['seconds'] = round(call['seconds'] + seconds, 4)
+            if failed:
+                call['errors'] += 1
+            if entity is not None:
+                entities = self.data['entities']
+                entities[entity] = round(entities.get(entity, 0.0) + seconds, 4)
+                if len(entities) > MAX_ENTITIES:
+                    # Only keep the slowest entities to bound the result size
+                    del entities[min(entities, key=entities.get)]
+            self.data['elapsed'] = round(time.time() - self._started, 4)
+
+
+class _RecordingClient:
+    """Proxy that times every public method call of the wrapped client."""
+
+    def __init__(self, client, recorder):
+        self._client = client
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+        recorder = self._recorder
+
+        def call(*args, **kwargs):
+            entity = call_entity(name, args, kwargs)
+            started = time.time()
+            failed = True
+            try:
+                response = attribute(*args, **kwargs)
+                failed = False
+                return response
+            finally:
+                recorder.record(name, entity, time.time() - started, failed)
+
+        return call
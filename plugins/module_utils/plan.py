@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+# Serialized change plans for a plan/apply workflow.
+#
+# In check mode a module with plan_file set writes the operations it would
+# perform to a JSON file, each with a fingerprint of the state it was
+# computed from. A later run without check mode applies that file instead
+# of reading and diffing every entity again; only the entities the plan
+# touches are read, to verify that they did not change since the plan was
+# written.
+#
+# Used by minio_bucket and minio_lifecycle. minio_user and
+# minio_service_account are left out because a plan would store secret
+# keys; minio_group, minio_policy and minio_retention converge a single
+# entity with one read (or, for objects, resume from a checkpoint), so a
+# plan would not save any reads.
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PLAN_VERSION = 1
+
+
+class PlanError(ValueError):
+    """The plan file is missing or does not belong to this task."""
+
+
+def fingerprint(state):
+    """Stable digest of a JSON serializable state, None for absent entities."""
+    data = json.dumps(state, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _write(path, plan):
+    # Replace atomically so an interrupted write never leaves a partial plan
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(plan, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def write_plan(path, module_name, params, operations):
+    """
+    Write the ordered operations of a check mode run. params are the task
+    parameters the plan was computed for; only their fingerprint is stored.
+    """
+    plan = {
+        'version': PLAN_VERSION,
+        'module': module_name,
+        'params': fingerprint(params),
+        'created_at': time.time(),
+        'applied_at': None,
+        'operations': operations,
+    }
+    _write(path, plan)
+    return plan
+
+
+def load_plan(path, module_name, params):
+    """Read a plan written by write_plan for the same module and parameters."""
+    if not os.path.exists(path):
+        raise PlanError(f'Plan file {path} does not exist, run the task in check mode first to write it')
+    try:
+        with open(path) as f:
+            plan = json.load(f)
+    except ValueError as e:
+        raise PlanError(f'Plan file {path} is not valid JSON: {str(e)}')
+    if plan.get('version') != PLAN_VERSION:
+        raise PlanError(f'Plan file {path} has unsupported version {plan.get("version")}')
+    if plan.get('module') != module_name:
+        raise PlanError(f'Plan file {path} was written by {plan.get("module")}, not {module_name}')
+    if plan.get('params') != fingerprint(params):
+        raise PlanError(f'Plan file {path} was written for different task parameters, write a new plan')
+    return plan
+
+
+def mark_applied(path, plan, remaining=None):
+    """
+    Record the outcome of an apply. Operations in remaining failed and stay
+    in the plan for a retry; once nothing remains the plan is marked applied
+    so that applying it again is a no-op instead of a stale plan error.
+    """
+    if remaining:
+        plan['operations'] = remaining
+    else:
+        plan['applied_at'] = time.time()
+    _write(path, plan)
+
+
+def stale_operations(operations, read_state, max_workers=4):
+    """
+    Re-read the state of every entity touched by operations with
+    read_state(operation) and return the entities whose fingerprint no
+    longer matches the plan. Entities without operations are never read.
+    """
+    def check(operation):
+        return fingerprint(read_state(operation)) != operation['fingerprint']
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        stale = list(executor.map(check, operations))
+    return [operation['entity'] for operation, is_stale in zip(operations, stale) if is_stale]
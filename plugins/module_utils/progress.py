@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# Progress reporting for long running bulk operations.
+#
+# Bulk paths write their counters to a small JSON status file so that runs
+# started with async/poll (or that outlive an SSH session) can be watched
+# with the minio_job_status module.
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+import os
+import threading
+import time
+
+
+class ProgressReporter:
+    """
+    Thread-safe counters for a bulk job, periodically flushed to a status
+    file. All methods are no-ops when path is None, so callers do not need
+    to check whether progress reporting was requested.
+
+    Used as a context manager, the job is marked failed when the block
+    exits with an exception before finish() was called, so pollers never
+    wait on a job that is no longer running.
+    """
+
+    def __init__(self, path, job, interval=2.0):
+        self.path = path
+        self.job = job
+        self.interval = interval
+        self.planned = 0
+        self.done = 0
+        self.failed = 0
+        self.state = 'running'
+        self.started_at = time.time()
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        self.write()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Also covers SystemExit raised by fail_json
+        if exc_type is not None and self.state == 'running':
+            self.finish(failed=True)
+        return False
+
+    def add_planned(self, count=1):
+        with self._lock:
+            self.planned += count
+        self._maybe_write()
+
+    def record(self, ok=True):
+        with self._lock:
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+        self._maybe_write()
+
+    def finish(self, failed=False):
+        self.state = 'failed' if failed else 'finished'
+        self.write()
+
+    def status(self):
+        now = time.time()
+        elapsed = now - self.started_at
+        processed = self.done + self.failed
+        return {
+            'job': self.job,
+            'pid': os.getpid(),
+            'state': self.state,
+            'planned': self.planned,
+            'done': self.done,
+            'failed_items': self.failed,
+            'rate': round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+            'elapsed': round(elapsed, 2),
+            'started_at': self.started_at,
+            'updated_at': now,
+        }
+
+    def _maybe_write(self):
+        # Throttle writes so that progress reporting stays cheap on large jobs
+        if time.time() - self._last_write >= self.interval:
+            self.write()
+
+    def write(self):
+        if self.path is None:
+            return
+        with self._lock:
+            status = self.status()
+            self._last_write = status['updated_at']
+            # Replace atomically so a reader never sees a partial file
+            tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+            with open(tmp_path, 'w') as f:
+                json.dump(status, f)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,553 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from minio import Minio
+from minio.error import S3Error, MinioAdminException
+from minio import MinioAdmin
+from minio.commonconfig import Tags
+from minio.credentials import StaticProvider
+from minio.versioningconfig import VersioningConfig, ENABLED, SUSPENDED
+from ansible_collections.ceesios.minio.plugins.module_utils.progress import ProgressReporter
+from ansible_collections.ceesios.minio.plugins.module_utils.metrics import MetricsRecorder
+from ansible_collections.ceesios.minio.plugins.module_utils.errors import NO_SUCH_QUOTA, classify, error_details, is_not_found
+from ansible_collections.ceesios.minio.plugins.module_utils.plan import (
+    PlanError, fingerprint, load_plan, mark_applied, stale_operations, write_plan)
+from concurrent.futures import ThreadPoolExecutor
+import json
+import re
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = r'''
+---
+module: minio_bucket
+short_description: Manage MinIO buckets
+description:
+    - This module creates, updates, and deletes buckets in MinIO.
+    - Existing buckets are found with a single C(list_buckets) call, missing buckets are created concurrently.
+    - Settings of existing buckets are only read when they are specified and only written when they differ.
+options:
+    endpoint_url:
+        description:
+            - The URL of the MinIO server.
+        required: true
+        type: str
+    access_key:
+        description:
+            - Access key for MinIO.
+        required: true
+        type: str
+    secret_key:
+        description:
+            - Secret key for MinIO.
+        required: true
+        type: str
+    cert_check:
+        description:
+            - Whether to verify the server certificate.
+        default: true
+        type: bool
+    buckets:
+        description:
+            - List of buckets to manage.
+        required: true
+        type: list
+        elements: dict
+        suboptions:
+            name:
+                description:
+                    - Name of the bucket.
+                required: true
+                type: str
+            object_lock:
+                description:
+                    - Create the bucket with object lock enabled.
+                    - Object lock can only be enabled when the bucket is created, existing buckets without it are reported as a warning.
+                required: false
+                type: bool
+            versioning:
+                description:
+                    - Desired versioning status. Left untouched when not set.
+                choices: ['enabled', 'suspended']
+                required: false
+                type: str
+            quota:
+                description:
+                    - Hard quota in bytes, C(0) clears the quota. Left untouched when not set.
+                required: false
+                type: int
+            tags:
+                description:
+                    - Bucket tags. An empty dict removes all tags. Left untouched when not set.
+                required: false
+                type: dict
+    state:
+        description:
+            - The desired state of the buckets.
+            - C(absent) only removes empty buckets.
+        choices: ['present', 'absent']
+        default: 'present'
+        type: str
+    max_workers:
+        description:
+            - Maximum number of concurrent bucket requests.
+        required: false
+        default: 4
+        type: int
+    progress_file:
+        description:
+            - Local file to which progress is written while the task runs.
+            - Read it with M(ceesios.minio.minio_job_status), for example while the task runs with C(async).
+        required: false
+        type: path
+    plan_file:
+        description:
+            - Local file holding the change plan of this task.
+            - In check mode the planned operations are written to this file, each with a fingerprint of the
+              bucket state it was computed from.
+            - Without check mode the plan is applied from this file instead of listing and reading every bucket.
+              Only the buckets the plan touches are read again, and the task fails without changes when one of them
+              differs from the planned state or when the task parameters differ from the ones the plan was written for.
+            - Applying an already applied plan does nothing. Failed operations stay in the plan and are retried by the next run.
+        required: false
+        type: path
+author:
+    - Cees Moerkerken (@ceesios)
+'''
+
+EXAMPLES = r'''
+- name: Create tenant buckets
+  minio_bucket:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    buckets:
+      - name: tenant-a
+        object_lock: true
+        quota: 107374182400
+        tags:
+          tenant: a
+      - name: tenant-b
+        versioning: enabled
+    max_workers: 16
+    state: "present"
+
+- name: Delete an empty bucket
+  minio_bucket:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    buckets:
+      - name: tenant-b
+    state: "absent"
+
+- name: Review bucket changes and write them to a plan
+  minio_bucket:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    buckets: "{{ tenant_buckets }}"
+    plan_file: /var/tmp/buckets.plan
+  check_mode: true
+
+- name: Apply the reviewed plan without reading untouched buckets
+  minio_bucket:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    buckets: "{{ tenant_buckets }}"
+    plan_file: /var/tmp/buckets.plan
+'''
+
+RETURN = r'''
+changed:
+  description: If any changes were made
+  returned: always
+  type: bool
+message:
+  description: Result message
+  returned: always
+  type: str
+diff:
+  description: Shows before and after states
+  returned: always
+  type: dict
+buckets:
+  description: Per bucket outcome with the settings that were changed
+  returned: always
+  type: list
+  elements: dict
+plan:
+  description: Path, number of operations and apply status of the change plan
+  returned: when plan_file is set
+  type: dict
+metrics:
+  description: Client calls per API operation, slowest entities and item counts, aggregated by the ceesios.minio.minio_profile callback
+  returned: always
+  type: dict
+'''
+
+def validate_endpoint_url(endpoint_url):
+    # Ensure the endpoint URL does not contain a path
+    if re.search(r'/', endpoint_url.split('://')[-1]):
+        raise ValueError("path in endpoint is not allowed")
+
+def strip_scheme(endpoint_url):
+    # Strip https:// or http:// from the endpoint_url
+    return re.sub(r'^https?://', '', endpoint_url)
+
+def derive_use_ssl(endpoint_url):
+    # Determine if SSL should be used based on the scheme
+    return endpoint_url.startswith('https://')
+
+def versioning_status(versioning):
+    return ENABLED if versioning == 'enabled' else SUSPENDED
+
+def new_tags(tags):
+    bucket_tags = Tags.new_bucket_tags()
+    for key, value in tags.items():
+        bucket_tags[key] = str(value)
+    return bucket_tags
+
+def read_quota(admin, name):
+    # A bucket without quota is reported as an error or an empty (null) body
+    try:
+        quota = json.loads(admin.bucket_quota_get(name) or 'null')
+    except MinioAdminException as e:
+        if not is_not_found(e, NO_SUCH_QUOTA):
+            raise
+        return 0
+    return (quota or {}).get('quota') or 0
+
+def read_settings(client, admin, bucket):
+    # Read only the settings that are managed for this bucket
+    name = bucket['name']
+    current = {}
+    if bucket.get('object_lock'):
+        try:
+            client.get_object_lock_config(name)
+            current['object_lock'] = True
+        except S3Error as e:
+            if classify(e).code != 'ObjectLockConfigurationNotFoundError':
+                raise
+            current['object_lock'] = False
+    if bucket.get('versioning') is not None:
+        status = client.get_bucket_versioning(name).status
+        current['versioning'] = {ENABLED: 'enabled', SUSPENDED: 'suspended'}.get(status)
+    if bucket.get('quota') is not None:
+        current['quota'] = read_quota(admin, name)
+    if bucket.get('tags') is not None:
+        current['tags'] = dict(client.get_bucket_tags(name) or {})
+    return current
+
+def desired_settings(bucket):
+    desired = {}
+    if bucket.get('object_lock'):
+        desired['object_lock'] = True
+    if bucket.get('versioning') is not None:
+        desired['versioning'] = bucket['versioning']
+    if bucket.get('quota') is not None:
+        desired['quota'] = bucket['quota']
+    if bucket.get('tags') is not None:
+        desired['tags'] = {key: str(value) for key, value in bucket['tags'].items()}
+    return desired
+
+def created_settings(bucket):
+    # Settings of a bucket right after make_bucket, so no read is needed
+    current = {}
+    if bucket.get('object_lock'):
+        current['object_lock'] = True
+    if bucket.get('versioning') is not None:
+        # Object lock implies versioning
+        current['versioning'] = 'enabled' if bucket.get('object_lock') else None
+    if bucket.get('quota') is not None:
+        current['quota'] = 0
+    if bucket.get('tags') is not None:
+        current['tags'] = {}
+    return current
+
+def apply_settings(client, admin, name, changes, desired):
+    for setting in changes:
+        if setting == 'versioning':
+            client.set_bucket_versioning(name, VersioningConfig(versioning_status(desired['versioning'])))
+        elif setting == 'quota':
+            admin.bucket_quota_set(name, desired['quota'])
+        elif setting == 'tags':
+            if desired['tags']:
+                client.set_bucket_tags(name, new_tags(desired['tags']))
+            else:
+                client.delete_bucket_tags(name)
+
+def bucket_operation(bucket, outcome, desired):
+    # Everything needed to perform the change later without reading again
+    return dict(
+        entity=bucket['name'],
+        action=outcome['action'],
+        changes=outcome['changes'],
+        object_lock=bool(bucket.get('object_lock')),
+        bucket=bucket,
+        desired=desired,
+        before=outcome['before'],
+        after=outcome['after'],
+        fingerprint=outcome['fingerprint'],
+    )
+
+def planned_state(client, admin, operation):
+    # State an operation was planned against, read the same way as when planning
+    if operation['action'] == 'updated':
+        return read_settings(client, admin, operation['bucket'])
+    return {'exists': True} if client.bucket_exists(operation['entity']) else None
+
+def apply_operation(client, admin, operation):
+    name = operation['entity']
+    if operation['action'] == 'removed':
+        client.remove_bucket(name)
+        return
+    if operation['action'] == 'created':
+        client.make_bucket(name, object_lock=operation['object_lock'])
+    apply_settings(client, admin, name, operation['changes'], operation['desired'])
+
+def converge_bucket(client, admin, bucket, exists, state, check_mode):
+    name = bucket['name']
+    outcome = dict(name=name, action=None, changes=[], before=None, after=None, warning=None,
+                   fingerprint=None, operation=None)
+
+    if state == 'absent':
+        if exists:
+            outcome['action'] = 'removed'
+            outcome['before'] = {'name': name}
+            outcome['fingerprint'] = fingerprint({'exists': True})
+            outcome['operation'] = bucket_operation(bucket, outcome, None)
+            if not check_mode:
+                apply_operation(client, admin, outcome['operation'])
+        return outcome
+
+    desired = desired_settings(bucket)
+    if exists:
+        current = read_settings(client, admin, bucket)
+        outcome['fingerprint'] = fingerprint(current)
+    else:
+        outcome['action'] = 'created'
+        current = created_settings(bucket)
+        outcome['fingerprint'] = fingerprint(None)
+
+    if current.get('object_lock') is False:
+        outcome['warning'] = f'Object lock can not be enabled on existing bucket {name}'
+        current.pop('object_lock')
+        desired.pop('object_lock')
+
+    changes = sorted(key for key in desired if current.get(key) != desired[key])
+    if changes:
+        outcome['changes'] = changes
+        outcome['action'] = outcome['action'] or 'updated'
+
+    if outcome['action']:
+        outcome['before'] = current if exists else None
+        outcome['after'] = desired
+        outcome['operation'] = bucket_operation(bucket, outcome, desired)
+        if not check_mode:
+            apply_operation(client, admin, outcome['operation'])
+    return outcome
+
+def apply_plan(module, client, admin, result, metrics, plan_file, params, max_workers, progress_file):
+    """
+    Apply the operations of a plan written in check mode. Only the buckets
+    the plan touches are read, to verify they are still in the planned state.
+    """
+    try:
+        plan = load_plan(plan_file, 'minio_bucket', params)
+    except PlanError as e:
+        module.fail_json(msg=str(e), **result)
+
+    operations = plan['operations']
+    result['plan'] = dict(path=plan_file, operations=len(operations), applied=False)
+    if plan['applied_at'] is not None:
+        result['message'] = f'Plan {plan_file} was already applied'
+        return
+
+    try:
+        stale = stale_operations(operations, lambda operation: planned_state(client, admin, operation), max_workers)
+    except (S3Error, MinioAdminException) as e:
+        module.fail_json(msg=f"Failed to verify plan {plan_file}: {str(e)}", **error_details(e), **result)
+    if stale:
+        module.fail_json(msg=f"Buckets changed since plan {plan_file} was written, write a new plan: {stale}", **result)
+
+    def worker(operation):
+        try:
+            apply_operation(client, admin, operation)
+            progress.record(ok=True)
+            return None
+        except (S3Error, MinioAdminException) as e:
+            progress.record(ok=False)
+            error = classify(e)
+            return f"{operation['entity']}: {error.code or error.status}: {error.message}"
+
+    try:
+        with ProgressReporter(progress_file, 'minio_bucket') as progress:
+            progress.add_planned(len(operations))
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                errors = list(executor.map(worker, operations))
+            progress.finish(failed=any(error is not None for error in errors))
+    except OSError as e:
+        module.fail_json(msg=f"Failed to write {e.filename}: {str(e)}", **result)
+
+    failed = [error for error in errors if error is not None]
+    before = {}
+    after = {}
+    for operation, error in zip(operations, errors):
+        if error is None:
+            result['buckets'].append(dict(name=operation['entity'], action=operation['action'],
+                                          changes=operation['changes']))
+            before[operation['entity']] = operation['before']
+            after[operation['entity']] = operation['after']
+    result['diff']['before'] = before
+    result['diff']['after'] = after
+
+    applied = len(operations) - len(failed)
+    result['changed'] = applied > 0
+    result['message'] = f'{applied} of {len(operations)} planned bucket changes applied'
+    metrics.set_items(len(operations), applied)
+
+    # Keep the failed operations in the plan so that a rerun retries only those
+    mark_applied(plan_file, plan, [operation for operation, error in zip(operations, errors) if error is not None])
+    if failed:
+        module.fail_json(msg=f"Failed to apply plan {plan_file}: {failed}", **result)
+    result['plan']['applied'] = True
+
+def run_module():
+    module_args = dict(
+        state=dict(type='str', required=False, default='present', choices=['present', 'absent']),
+        access_key=dict(type='str', required=True, no_log=True),
+        secret_key=dict(type='str', required=True, no_log=True),
+        endpoint_url=dict(type='str', required=True),
+        cert_check=dict(type='bool', default=True),
+        buckets=dict(type='list', required=True, elements='dict', options=dict(
+            name=dict(type='str', required=True),
+            object_lock=dict(type='bool', required=False),
+            versioning=dict(type='str', required=False, choices=['enabled', 'suspended']),
+            quota=dict(type='int', required=False),
+            tags=dict(type='dict', required=False)
+        )),
+        max_workers=dict(type='int', required=False, default=4),
+        progress_file=dict(type='path', required=False),
+        plan_file=dict(type='path', required=False)
+    )
+
+    result = dict(
+        changed=False,
+        original_message='',
+        message='',
+        diff=dict(before='', after=''),
+        buckets=[]
+    )
+    metrics = MetricsRecorder('minio_bucket')
+    result['metrics'] = metrics.data
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    state = module.params['state']
+    access_key = module.params['access_key']
+    secret_key = module.params['secret_key']
+    endpoint_url = module.params['endpoint_url']
+    cert_check = module.params['cert_check']
+    buckets = module.params['buckets']
+    max_workers = module.params['max_workers']
+    progress_file = module.params['progress_file']
+    plan_file = module.params['plan_file']
+    use_ssl = derive_use_ssl(endpoint_url)
+    endpoint_url = strip_scheme(endpoint_url)
+
+    try:
+        validate_endpoint_url(endpoint_url)
+    except ValueError as e:
+        module.fail_json(msg=str(e), **result)
+
+    client = metrics.wrap(Minio(endpoint_url, access_key=access_key, secret_key=secret_key,
+                                secure=use_ssl, cert_check=cert_check))
+    admin = metrics.wrap(MinioAdmin(endpoint=endpoint_url, credentials=StaticProvider(access_key, secret_key),
+                                    secure=use_ssl, cert_check=cert_check))
+
+    # The plan is only valid for the same server and buckets
+    plan_params = dict(endpoint_url=endpoint_url, state=state, buckets=buckets)
+    if plan_file and not module.check_mode:
+        apply_plan(module, client, admin, result, metrics, plan_file, plan_params, max_workers, progress_file)
+        module.exit_json(**result)
+
+    try:
+        existing = set(bucket.name for bucket in client.list_buckets())
+    except S3Error as e:
+        module.fail_json(msg=str(e), **error_details(e), **result)
+
+    # Drop duplicates while keeping the order of the task
+    unique = list({bucket['name']: bucket for bucket in buckets}.values())
+
+    def worker(bucket):
+        try:
+            outcome = converge_bucket(client, admin, bucket, bucket['name'] in existing, state, module.check_mode)
+            progress.record(ok=True)
+            return outcome, None
+        except (S3Error, MinioAdminException) as e:
+            progress.record(ok=False)
+            error = classify(e)
+            return dict(name=bucket['name']), f"{error.code or error.status}: {error.message}"
+        except ValueError as e:
+            progress.record(ok=False)
+            return dict(name=bucket['name']), str(e)
+
+    try:
+        with ProgressReporter(progress_file, 'minio_bucket') as progress:
+            progress.add_planned(len(unique))
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                outcomes = list(executor.map(worker, unique))
+            progress.finish(failed=any(error is not None for outcome, error in outcomes))
+    except OSError as e:
+        module.fail_json(msg=f"Failed to write {e.filename}: {str(e)}", **result)
+
+    failed = []
+    before = {}
+    after = {}
+    operations = []
+    for outcome, error in outcomes:
+        if error is not None:
+            failed.append(f"{outcome['name']}: {error}")
+            continue
+        warning = outcome.pop('warning')
+        if warning:
+            module.warn(warning)
+        if outcome['action']:
+            before[outcome['name']] = outcome['before']
+            after[outcome['name']] = outcome['after']
+        if outcome['operation']:
+            operations.append(outcome['operation'])
+        for key in ('before', 'after', 'fingerprint', 'operation'):
+            outcome.pop(key)
+        result['buckets'].append(outcome)
+
+    changed_count = len(before)
+    result['changed'] = changed_count > 0
+    result['diff']['before'] = before
+    result['diff']['after'] = after
+    result['message'] = f'{changed_count} of {len(unique)} buckets changed'
+    metrics.set_items(len(unique), changed_count)
+
+    if failed:
+        module.fail_json(msg=f"Failed to converge buckets: {failed}", **result)
+
+    if plan_file:
+        write_plan(plan_file, 'minio_bucket', plan_params, operations)
+        result['plan'] = dict(path=plan_file, operations=len(operations), applied=False)
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
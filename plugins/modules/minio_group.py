@@ -5,6 +5,8 @@ from minio import Minio
 from minio.error import MinioAdminException
 from minio import MinioAdmin
 from minio.credentials import StaticProvider
+from ansible_collections.ceesios.minio.plugins.module_utils.metrics import MetricsRecorder
+from ansible_collections.ceesios.minio.plugins.module_utils.errors import NO_SUCH_GROUP, error_details, is_not_found
 import json
 import re
 
@@ -36,6 +38,11 @@ options:
             - Secret key for MinIO.
         required: true
         type: str
+    cert_check:
+        description:
+            - Verify the TLS certificate of the MinIO server.
+        default: true
+        type: bool
     group_name:
         description:
             - Name of the group to manage.
@@ -44,14 +51,25 @@ options:
     users:
         description:
             - List of users to be added to the group.
+            - Members not in the list are removed. Members are not managed when omitted.
+        required: false
+        type: list
+        elements: str
+    policies:
+        description:
+            - List of policies attached to the group.
+            - Policies not in the list are detached. Policies are not managed when omitted.
+            - Attached policies are read from the same C(group_info) call as the status and members,
+              so converging a group takes a single read.
         required: false
         type: list
         elements: str
     state:
         description:
             - The desired state of the group.
-        choices: ['present', 'absent']
-        default: 'present'
+            - C(disabled) creates or updates the group like C(present) and then disables it.
+        choices: ['present', 'absent', 'disabled']
+        required: true
         type: str
 author:
     - Cees Moerkerken (@ceesios)
@@ -69,6 +87,19 @@ EXAMPLES = r'''
       - user2
     state: "present"
 
+- name: Manage members, attached policies and status in one task
+  minio_group:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    group_name: "example_group"
+    users:
+      - user1
+    policies:
+      - readwrite
+      - diagnostics
+    state: "disabled"
+
 - name: Delete a group
   minio_group:
     endpoint_url: "http://minio.example.com"
@@ -91,6 +122,10 @@ diff:
   description: Shows before and after states
   returned: always
   type: dict
+metrics:
+  description: Client calls per API operation, slowest entities and item counts, aggregated by the ceesios.minio.minio_profile callback
+  returned: always
+  type: dict
 '''
 
 def validate_endpoint_url(endpoint_url):
@@ -111,6 +146,55 @@ def set_diff(result, current, desired):
     result['diff']['before'] = current
     result['diff']['after'] = desired
 
+def parse_policies(policy):
+    # group_info returns the attached policies as one comma separated string
+    return sorted(set(name.strip() for name in (policy or '').split(',') if name.strip()))
+
+def update_group(client, group_name, current, desired):
+    """
+    Converge an existing group with at most one call per kind of change.
+    Returns the list of applied changes for the result message.
+    """
+    changes = []
+    enable = current["status"] == "disabled" and desired["status"] == "enabled"
+    disable = current["status"] == "enabled" and desired["status"] == "disabled"
+
+    if enable:
+        client.group_enable(group_name)
+        changes.append('enabled')
+
+    if "members" in desired:
+        current_members = set(current["members"])
+        desired_members = set(desired["members"])
+        members_to_add = desired_members - current_members
+        members_to_remove = current_members - desired_members
+        if members_to_add:
+            client.group_add(group_name, sorted(members_to_add))
+            changes.append(f'members added: {sorted(members_to_add)}')
+        if members_to_remove:
+            client.group_remove(group_name, sorted(members_to_remove))
+            changes.append(f'members removed: {sorted(members_to_remove)}')
+
+    if "policies" in desired:
+        current_policies = set(current["policies"])
+        desired_policies = set(desired["policies"])
+        policies_to_attach = desired_policies - current_policies
+        policies_to_detach = current_policies - desired_policies
+        if policies_to_attach:
+            client.attach_policy(sorted(policies_to_attach), group=group_name)
+            changes.append(f'policies attached: {sorted(policies_to_attach)}')
+        if policies_to_detach:
+            client.detach_policy(sorted(policies_to_detach), group=group_name)
+            changes.append(f'policies detached: {sorted(policies_to_detach)}')
+
+    # Disable last so the membership and policy changes above still apply
+    # to an enabled group
+    if disable:
+        client.group_disable(group_name)
+        changes.append('disabled')
+
+    return changes
+
 def run_module():
     module_args = dict(
         state=dict(type='str', required=True, choices=['present', 'absent', 'disabled']),
@@ -119,7 +203,8 @@ def run_module():
         endpoint_url=dict(type='str', required=True),
         cert_check=dict(type='bool', default=True),
         group_name=dict(type='str', required=True),
-        users=dict(type='list', required=False, elements='str', default=None)
+        users=dict(type='list', required=False, elements='str', default=None),
+        policies=dict(type='list', required=False, elements='str', default=None)
     )
 
     result = dict(
@@ -128,6 +213,8 @@ def run_module():
         message='',
         diff=dict(before='', after='')
     )
+    metrics = MetricsRecorder('minio_group')
+    result['metrics'] = metrics.data
 
     module = AnsibleModule(
         argument_spec=module_args,
@@ -142,6 +229,7 @@ def run_module():
     cert_check = module.params['cert_check']
     group_name = module.params['group_name']
     users = module.params['users']
+    policies = module.params['policies']
     use_ssl = derive_use_ssl(endpoint_url)
     endpoint_url = strip_scheme(endpoint_url)
 
@@ -151,74 +239,66 @@ def run_module():
         module.fail_json(msg=str(e), **result)
 
     credentials = StaticProvider(access_key, secret_key)
-    client = MinioAdmin(endpoint_url, credentials=credentials, secure=use_ssl, cert_check=cert_check)
+    client = metrics.wrap(MinioAdmin(endpoint=endpoint_url, credentials=credentials, secure=use_ssl, cert_check=cert_check))
 
     try:
         group_info = None
-        group_exists = False
         try:
-            group_info = client.group_info(group_name)
-            group_info = json.loads(group_info)  # Ensure group_info is a dictionary
-            group_info.pop("updatedAt")  # Remove updatedAt from current
-            group_info.pop("policy")  # Remove policy from current
-            if users is None:
-                group_info.pop("members") # Ignore members if users is None
-            group_info_sorted = dict(sorted(group_info.items()))
-            group_exists = True
+            group_info = json.loads(client.group_info(group_name))
         except MinioAdminException as e:
-            if "XMinioAdminNoSuchGroup" not in e._body:
+            if not is_not_found(e, NO_SUCH_GROUP):
                 raise
-        current = group_info_sorted if group_exists else None
+        group_exists = group_info is not None
 
-        desired_unsorted = {
+        # group_info reports status, members and attached policies in one
+        # response, so everything below is decided without further reads
+        current = None
+        if group_exists:
+            current = {
+                "name": group_name,
+                "members": sorted(group_info.get("members") or []),
+                "policies": parse_policies(group_info.get("policy")),
+                "status": group_info.get("status", "enabled"),
+            }
+            if users is None:
+                current.pop("members")  # Ignore members if users is None
+            if policies is None:
+                current.pop("policies")  # Ignore policies if policies is None
+
+        desired = {
             "name": group_name,
-            "members": users,
-            "status": "enabled" if state == "present" else "disabled"
+            "members": sorted(set(users or [])),
+            "policies": sorted(set(policies or [])),
+            "status": "disabled" if state == "disabled" else "enabled",
         }
-        desired = dict(sorted(desired_unsorted.items()))
-
         if users is None:
             desired.pop("members")
+        if policies is None:
+            desired.pop("policies")
 
-        if state == 'present':
+        if state in ('present', 'disabled'):
             if not group_exists:
                 set_diff(result, current, desired)
                 if not module.check_mode:
                     try:
-                        client.group_add(group_name,users)
+                        client.group_add(group_name, users)
+                        if policies:
+                            client.attach_policy(desired["policies"], group=group_name)
+                        if state == 'disabled':
+                            client.group_disable(group_name)
                         result['message'] = f'Group {group_name} created and users added'
                     except MinioAdminException as e:
-                        module.fail_json(msg=f"Failed to add group {group_name}: with users: {users} {str(e)}", **result)
+                        module.fail_json(msg=f"Failed to add group {group_name}: with users: {users} {str(e)}", **error_details(e), **result)
+            elif current != desired:
+                set_diff(result, current, desired)
+                if not module.check_mode:
+                    try:
+                        changes = update_group(client, group_name, current, desired)
+                        result['message'] = f'Group {group_name} updated: {", ".join(changes)}'
+                    except MinioAdminException as e:
+                        module.fail_json(msg=f"Failed to update group {group_name}: {str(e)}", **error_details(e), **result)
             else:
-                if group_info["status"] == 'disabled':
-                    set_diff(result, current, desired)
-                    if not module.check_mode:
-                        try:
-                            client.group_enable(group_name)
-                            result['message'] = f'Group {group_name} enabled'
-                        except MinioAdminException as e:
-                            module.fail_json(msg=f"Failed to enable group {group_name}: {str(e)}", **result)
-                elif users is not None:
-                    if current["members"] is None:
-                        current_members = set([])
-                    else:
-                        current_members = set(current["members"])
-                    desired_members = set(users)
-                    if current_members != desired_members:
-                        set_diff(result, current, desired)
-                        if not module.check_mode:
-                            try:
-                                members_to_add = desired_members - current_members
-                                members_to_remove = current_members - desired_members
-                                if members_to_add:
-                                    client.group_add(group_name,list(members_to_add))
-                                if members_to_remove:
-                                    client.group_remove(group_name,list(members_to_remove))
-                                result['message'] = f'Group {group_name} members updated'
-                            except MinioAdminException as e:
-                                module.fail_json(msg=f"Failed to update members of group {group_name}: {str(e)}", **result)
-                    else:
-                        result['message'] = f'Group {group_name} already exists and members are up to date'
+                result['message'] = f'Group {group_name} already exists and is up to date'
         elif state == 'absent':
             if group_exists:
                 set_diff(result, current, "")
@@ -227,12 +307,13 @@ def run_module():
                         client.group_remove(group_name)
                         result['message'] = f'Group {group_name} removed'
                     except MinioAdminException as e:
-                        module.fail_json(msg=f"Failed to remove group {group_name}: {str(e)}", **result)
+                        module.fail_json(msg=f"Failed to remove group {group_name}: {str(e)}", **error_details(e), **result)
             else:
-                result['message'] = f'Group {group_name} does not exist. Group info: {group_info}'
+                result['message'] = f'Group {group_name} does not exist'
     except MinioAdminException as e:
-        module.fail_json(msg=str(e), **result)
+        module.fail_json(msg=str(e), **error_details(e), **result)
 
+    metrics.set_items(1, int(result['changed']))
     module.exit_json(**result)
 
 def main():
@@ -0,0 +1,140 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+import json
+import os
+import time
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = r'''
+---
+module: minio_job_status
+short_description: Read the progress of a bulk MinIO job
+description:
+    - This module reads the status file written by the I(progress_file) option of the bulk paths in this collection.
+    - It only reads a local file and never contacts the MinIO server, so it can be polled cheaply while a bulk task runs with C(async).
+options:
+    path:
+        description:
+            - Path of the status file.
+        required: true
+        type: path
+author:
+    - Cees Moerkerken (@ceesios)
+'''
+
+EXAMPLES = r'''
+- name: Rotate many users in the background
+  minio_user:
+    endpoint_url: "http://minio.example.com"
+    access_key: "admin_access_key"
+    secret_key: "admin_secret_key"
+    users: "{{ app_users }}"
+    secret_fingerprint_file: "/var/lib/minio-ansible/user_secrets.json"
+    progress_file: "/var/tmp/minio_users.progress"
+    state: "present"
+  async: 3600
+  poll: 0
+  register: rotate_job
+
+- name: Wait for the job while reporting throughput
+  minio_job_status:
+    path: "/var/tmp/minio_users.progress"
+  register: job
+  until: job.state in ['finished', 'failed']
+  retries: 360
+  delay: 10
+'''
+
+RETURN = r'''
+changed:
+  description: Always false, the module only reads the status file
+  returned: always
+  type: bool
+exists:
+  description: Whether the status file exists
+  returned: always
+  type: bool
+job:
+  description: Name of the module that writes the status file
+  returned: when exists
+  type: str
+state:
+  description: C(running), C(finished) or C(failed)
+  returned: when exists
+  type: str
+planned:
+  description: Number of items planned so far
+  returned: when exists
+  type: int
+done:
+  description: Number of items processed successfully
+  returned: when exists
+  type: int
+failed_items:
+  description: Number of items that failed
+  returned: when exists
+  type: int
+rate:
+  description: Items processed per second
+  returned: when exists
+  type: float
+percent:
+  description: Percentage of planned items processed
+  returned: when exists
+  type: float
+elapsed:
+  description: Seconds since the job started
+  returned: when exists
+  type: float
+age:
+  description: Seconds since the status file was last updated
+  returned: when exists
+  type: float
+'''
+
+def run_module():
+    module_args = dict(
+        path=dict(type='path', required=True)
+    )
+
+    result = dict(
+        changed=False,
+        exists=False
+    )
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    path = module.params['path']
+
+    if not os.path.exists(path):
+        module.exit_json(**result)
+
+    try:
+        with open(path) as f:
+            status = json.load(f)
+    except (OSError, ValueError) as e:
+        module.fail_json(msg=f"Failed to read status file {path}: {str(e)}", **result)
+
+    result.update(status)
+    result['exists'] = True
+    processed = status.get('done', 0) + status.get('failed_items', 0)
+    planned = status.get('planned') or 0
+    result['percent'] = round(100.0 * processed / planned, 2) if planned else 0.0
+    result['age'] = round(time.time() - status.get('updated_at', time.time()), 2)
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
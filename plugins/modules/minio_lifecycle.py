@@ -0,0 +1,572 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from minio import Minio
+from minio.error import S3Error
+from minio.commonconfig import ENABLED, DISABLED, AndOperator, Filter, Tags
+from minio.lifecycleconfig import (
+    AbortIncompleteMultipartUpload,
+    Expiration,
+    LifecycleConfig,
+    NoncurrentVersionExpiration,
+    NoncurrentVersionTransition,
+    Rule,
+    Transition,
+)
+from ansible_collections.ceesios.minio.plugins.module_utils.progress import ProgressReporter
+from ansible_collections.ceesios.minio.plugins.module_utils.metrics import MetricsRecorder
+from ansible_collections.ceesios.minio.plugins.module_utils.errors import classify, error_details
+from ansible_collections.ceesios.minio.plugins.module_utils.plan import (
+    PlanError, fingerprint, load_plan, mark_applied, stale_operations, write_plan)
+from concurrent.futures import ThreadPoolExecutor
+import re
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = r'''
+---
+module: minio_lifecycle
+short_description: Manage MinIO bucket lifecycle (ILM) rules
+description:
+    - This module sets or removes the lifecycle configuration of one or more MinIO buckets.
+    - The requested rules and the current configuration are normalized into an order-insensitive form,
+      the configuration is only written when they differ. Every write triggers scanner work on the cluster.
+    - Current configurations of all buckets are read concurrently.
+options:
+    endpoint_url:
+        description:
+            - The URL of the MinIO server.
+        required: true
+        type: str
+    access_key:
+        description:
+            - Access key for MinIO.
+        required: true
+        type: str
+    secret_key:
+        description:
+            - Secret key for MinIO.
+        required: true
+        type: str
+    cert_check:
+        description:
+            - Whether to verify the server certificate.
+        default: true
+        type: bool
+    bucket_name:
+        description:
+            - Name of the bucket to manage. Mutually exclusive with I(buckets).
+        required: false
+        type: str
+    buckets:
+        description:
+            - Names of the buckets to apply the same rules to. Mutually exclusive with I(bucket_name).
+        required: false
+        type: list
+        elements: str
+    rules:
+        description:
+            - Lifecycle rules. The rules replace the complete lifecycle configuration of the bucket.
+            - An empty list removes the lifecycle configuration.
+        required: false
+        type: list
+        elements: dict
+        suboptions:
+            id:
+                description:
+                    - Unique identifier of the rule.
+                required: true
+                type: str
+            status:
+                description:
+                    - Whether the rule is enabled.
+                choices: ['enabled', 'disabled']
+                default: 'enabled'
+                type: str
+            prefix:
+                description:
+                    - Only apply the rule to objects starting with this prefix.
+                default: ''
+                type: str
+            tags:
+                description:
+                    - Only apply the rule to objects with all of these tags.
+                required: false
+                type: dict
+            expiration_days:
+                description:
+                    - Expire objects this many days after creation.
+                required: false
+                type: int
+            expired_object_delete_marker:
+                description:
+                    - Remove delete markers without noncurrent versions.
+                required: false
+                type: bool
+            transition_days:
+                description:
+                    - Transition objects to I(transition_storage_class) this many days after creation.
+                required: false
+                type: int
+            transition_storage_class:
+                description:
+                    - Remote tier to transition objects to.
+                required: false
+                type: str
+            noncurrent_expiration_days:
+                description:
+                    - Expire noncurrent versions this many days after they became noncurrent.
+                required: false
+                type: int
+            noncurrent_transition_days:
+                description:
+                    - Transition noncurrent versions to I(noncurrent_transition_storage_class) this many days after they became noncurrent.
+                required: false
+                type: int
+            noncurrent_transition_storage_class:
+                description:
+                    - Remote tier to transition noncurrent versions to.
+                required: false
+                type: str
+            abort_incomplete_multipart_days:
+                description:
+                    - Abort incomplete multipart uploads this many days after they were started.
+                required: false
+                type: int
+    state:
+        description:
+            - The desired state of the lifecycle configuration.
+        choices: ['present', 'absent']
+        default: 'present'
+        type: str
+    max_workers:
+        description:
+            - Maximum number of concurrent bucket requests.
+        required: false
+        default: 4
+        type: int
+    progress_file:
+        description:
+            - Local file to which progress is written while the task runs.
+            - Read it with M(ceesios.minio.minio_job_status), for example while the task runs with C(async).
+        required: false
+        type: path
+    plan_file:
+        description:
+            - Local file holding the change plan of this task.
+            - In check mode the buckets whose rules differ are written to this file, each with a fingerprint of
+              its current rules.
+            - Without check mode the plan is applied from this file. Only the buckets in the plan are read again,
+              and the task fails without changes when their rules differ from the planned state or when the task
+              parameters differ from the ones the plan was written for.
+            - Applying an already applied plan does nothing. Failed operations stay in the plan and are retried by the next run.
+        required: false
+        type: path
+author:
+    - Cees Moerkerken (@ceesios)
+'''
+
+EXAMPLES = r'''
+- name: Expire temporary objects and old versions
+  minio_lifecycle:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    bucket_name: "example-bucket"
+    rules:
+      - id: expire-tmp
+        prefix: "tmp/"
+        expiration_days: 7
+      - id: expire-noncurrent
+        noncurrent_expiration_days: 30
+        abort_incomplete_multipart_days: 2
+    state: "present"
+
+- name: Apply one rule set to all tenant buckets
+  minio_lifecycle:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    buckets: "{{ tenant_buckets }}"
+    rules:
+      - id: tier-cold
+        transition_days: 90
+        transition_storage_class: "COLDTIER"
+    max_workers: 16
+    state: "present"
+
+- name: Remove the lifecycle configuration
+  minio_lifecycle:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    bucket_name: "example-bucket"
+    state: "absent"
+
+- name: Write the lifecycle changes of all tenant buckets to a plan
+  minio_lifecycle:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    buckets: "{{ tenant_buckets }}"
+    rules: "{{ tenant_rules }}"
+    plan_file: /var/tmp/lifecycle.plan
+  check_mode: true
+
+- name: Apply the reviewed plan
+  minio_lifecycle:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    buckets: "{{ tenant_buckets }}"
+    rules: "{{ tenant_rules }}"
+    plan_file: /var/tmp/lifecycle.plan
+'''
+
+RETURN = r'''
+changed:
+  description: If any changes were made
+  returned: always
+  type: bool
+message:
+  description: Result message
+  returned: always
+  type: str
+diff:
+  description: Shows the normalized rules before and after per changed bucket
+  returned: always
+  type: dict
+buckets:
+  description: Per bucket outcome
+  returned: always
+  type: list
+  elements: dict
+plan:
+  description: Path, number of operations and apply status of the change plan
+  returned: when plan_file is set
+  type: dict
+metrics:
+  description: Client calls per API operation, slowest entities and item counts, aggregated by the ceesios.minio.minio_profile callback
+  returned: always
+  type: dict
+'''
+
+def validate_endpoint_url(endpoint_url):
+    # Ensure the endpoint URL does not contain a path
+    if re.search(r'/', endpoint_url.split('://')[-1]):
+        raise ValueError("path in endpoint is not allowed")
+
+def strip_scheme(endpoint_url):
+    # Strip https:// or http:// from the endpoint_url
+    return re.sub(r'^https?://', '', endpoint_url)
+
+def derive_use_ssl(endpoint_url):
+    # Determine if SSL should be used based on the scheme
+    return endpoint_url.startswith('https://')
+
+def normalize_rules(rules):
+    # Canonical form: unset fields are dropped and rules are sorted by id
+    normalized = []
+    for rule in rules:
+        canonical = dict((key, value) for key, value in rule.items() if value not in (None, {}, False))
+        canonical['prefix'] = rule.get('prefix') or ''
+        if canonical.get('tags'):
+            canonical['tags'] = dict((key, str(value)) for key, value in canonical['tags'].items())
+        normalized.append(canonical)
+    return sorted(normalized, key=lambda rule: rule['id'])
+
+def rule_from_config(rule):
+    # Flatten a minio Rule into the same keys as the module options
+    flat = {
+        'id': rule.rule_id,
+        'status': 'enabled' if rule.status == ENABLED else 'disabled',
+    }
+    rule_filter = rule.rule_filter
+    if rule_filter is not None:
+        if rule_filter.and_operator is not None:
+            flat['prefix'] = rule_filter.and_operator.prefix
+            flat['tags'] = dict(rule_filter.and_operator.tags or {})
+        else:
+            flat['prefix'] = rule_filter.prefix
+            if rule_filter.tag is not None:
+                flat['tags'] = {rule_filter.tag.key: rule_filter.tag.value}
+    if rule.expiration is not None:
+        flat['expiration_days'] = rule.expiration.days
+        flat['expired_object_delete_marker'] = rule.expiration.expired_object_delete_marker
+    if rule.transition is not None:
+        flat['transition_days'] = rule.transition.days
+        flat['transition_storage_class'] = rule.transition.storage_class
+    if rule.noncurrent_version_expiration is not None:
+        flat['noncurrent_expiration_days'] = rule.noncurrent_version_expiration.noncurrent_days
+    if rule.noncurrent_version_transition is not None:
+        flat['noncurrent_transition_days'] = rule.noncurrent_version_transition.noncurrent_days
+        flat['noncurrent_transition_storage_class'] = rule.noncurrent_version_transition.storage_class
+    if rule.abort_incomplete_multipart_upload is not None:
+        flat['abort_incomplete_multipart_days'] = rule.abort_incomplete_multipart_upload.days_after_initiation
+    return flat
+
+def config_from_rules(rules):
+    config_rules = []
+    for rule in rules:
+        if rule.get('tags'):
+            tags = Tags.new_bucket_tags()
+            tags.update(rule['tags'])
+            rule_filter = Filter(and_operator=AndOperator(rule['prefix'] or None, tags))
+        else:
+            rule_filter = Filter(prefix=rule['prefix'])
+        expiration = None
+        if rule.get('expiration_days') or rule.get('expired_object_delete_marker'):
+            expiration = Expiration(days=rule.get('expiration_days'),
+                                    expired_object_delete_marker=rule.get('expired_object_delete_marker'))
+        transition = None
+        if rule.get('transition_days'):
+            transition = Transition(days=rule['transition_days'], storage_class=rule.get('transition_storage_class'))
+        noncurrent_expiration = None
+        if rule.get('noncurrent_expiration_days'):
+            noncurrent_expiration = NoncurrentVersionExpiration(rule['noncurrent_expiration_days'])
+        noncurrent_transition = None
+        if rule.get('noncurrent_transition_days'):
+            noncurrent_transition = NoncurrentVersionTransition(
+                rule['noncurrent_transition_days'], rule.get('noncurrent_transition_storage_class'))
+        abort_multipart = None
+        if rule.get('abort_incomplete_multipart_days'):
+            abort_multipart = AbortIncompleteMultipartUpload(rule['abort_incomplete_multipart_days'])
+        config_rules.append(Rule(
+            ENABLED if rule.get('status', 'enabled') == 'enabled' else DISABLED,
+            rule_filter=rule_filter,
+            rule_id=rule['id'],
+            abort_incomplete_multipart_upload=abort_multipart,
+            expiration=expiration,
+            noncurrent_version_expiration=noncurrent_expiration,
+            noncurrent_version_transition=noncurrent_transition,
+            transition=transition,
+        ))
+    return LifecycleConfig(config_rules)
+
+def read_rules(client, bucket_name):
+    config = client.get_bucket_lifecycle(bucket_name)
+    if config is None:
+        return []
+    return normalize_rules([rule_from_config(rule) for rule in config.rules])
+
+def apply_lifecycle(client, bucket_name, desired_config):
+    if desired_config is not None:
+        client.set_bucket_lifecycle(bucket_name, desired_config)
+    else:
+        client.delete_bucket_lifecycle(bucket_name)
+
+def apply_plan(module, client, result, metrics, plan_file, params, desired, desired_config, max_workers, progress_file):
+    """
+    Apply the operations of a plan written in check mode. Only the buckets
+    the plan touches are read, to verify their rules did not change since.
+    """
+    try:
+        plan = load_plan(plan_file, 'minio_lifecycle', params)
+    except PlanError as e:
+        module.fail_json(msg=str(e), **result)
+
+    operations = plan['operations']
+    result['plan'] = dict(path=plan_file, operations=len(operations), applied=False)
+    if plan['applied_at'] is not None:
+        result['message'] = f'Plan {plan_file} was already applied'
+        return
+
+    try:
+        stale = stale_operations(operations, lambda operation: read_rules(client, operation['entity']), max_workers)
+    except S3Error as e:
+        module.fail_json(msg=f"Failed to verify plan {plan_file}: {str(e)}", **error_details(e), **result)
+    if stale:
+        module.fail_json(msg=f"Lifecycle rules changed since plan {plan_file} was written, write a new plan: {stale}", **result)
+
+    def worker(operation):
+        try:
+            apply_lifecycle(client, operation['entity'], desired_config)
+            progress.record(ok=True)
+            return None
+        except S3Error as e:
+            progress.record(ok=False)
+            error = classify(e)
+            return f"{operation['entity']}: {error.code or error.status}: {error.message}"
+
+    try:
+        with ProgressReporter(progress_file, 'minio_lifecycle') as progress:
+            progress.add_planned(len(operations))
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                errors = list(executor.map(worker, operations))
+            progress.finish(failed=any(error is not None for error in errors))
+    except OSError as e:
+        module.fail_json(msg=f"Failed to write {e.filename}: {str(e)}", **result)
+
+    failed = [error for error in errors if error is not None]
+    before = {}
+    after = {}
+    for operation, error in zip(operations, errors):
+        if error is None:
+            result['buckets'].append(dict(name=operation['entity'], action=operation['action']))
+            before[operation['entity']] = operation['before']
+            after[operation['entity']] = desired
+    result['diff']['before'] = before
+    result['diff']['after'] = after
+
+    applied = len(operations) - len(failed)
+    result['changed'] = applied > 0
+    result['message'] = f'Lifecycle configuration changed on {applied} of {len(operations)} planned buckets'
+    metrics.set_items(len(operations), applied)
+
+    # Keep the failed operations in the plan so that a rerun retries only those
+    mark_applied(plan_file, plan, [operation for operation, error in zip(operations, errors) if error is not None])
+    if failed:
+        module.fail_json(msg=f"Failed to apply plan {plan_file}: {failed}", **result)
+    result['plan']['applied'] = True
+
+def run_module():
+    rule_options = dict(
+        id=dict(type='str', required=True),
+        status=dict(type='str', default='enabled', choices=['enabled', 'disabled']),
+        prefix=dict(type='str', default=''),
+        tags=dict(type='dict', required=False),
+        expiration_days=dict(type='int', required=False),
+        expired_object_delete_marker=dict(type='bool', required=False),
+        transition_days=dict(type='int', required=False),
+        transition_storage_class=dict(type='str', required=False),
+        noncurrent_expiration_days=dict(type='int', required=False),
+        noncurrent_transition_days=dict(type='int', required=False),
+        noncurrent_transition_storage_class=dict(type='str', required=False),
+        abort_incomplete_multipart_days=dict(type='int', required=False)
+    )
+    module_args = dict(
+        state=dict(type='str', required=False, default='present', choices=['present', 'absent']),
+        access_key=dict(type='str', required=True, no_log=True),
+        secret_key=dict(type='str', required=True, no_log=True),
+        endpoint_url=dict(type='str', required=True),
+        cert_check=dict(type='bool', default=True),
+        bucket_name=dict(type='str', required=False),
+        buckets=dict(type='list', required=False, elements='str'),
+        rules=dict(type='list', required=False, elements='dict', options=rule_options),
+        max_workers=dict(type='int', required=False, default=4),
+        progress_file=dict(type='path', required=False),
+        plan_file=dict(type='path', required=False)
+    )
+
+    result = dict(
+        changed=False,
+        original_message='',
+        message='',
+        diff=dict(before='', after=''),
+        buckets=[]
+    )
+    metrics = MetricsRecorder('minio_lifecycle')
+    result['metrics'] = metrics.data
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True,
+        required_if=[
+            ('state', 'present', ('rules',)),
+        ],
+        required_one_of=[('bucket_name', 'buckets')],
+        mutually_exclusive=[('bucket_name', 'buckets')],
+    )
+
+    state = module.params['state']
+    access_key = module.params['access_key']
+    secret_key = module.params['secret_key']
+    endpoint_url = module.params['endpoint_url']
+    cert_check = module.params['cert_check']
+    bucket_names = [module.params['bucket_name']] if module.params['bucket_name'] else module.params['buckets']
+    rules = module.params['rules'] or []
+    max_workers = module.params['max_workers']
+    progress_file = module.params['progress_file']
+    plan_file = module.params['plan_file']
+    use_ssl = derive_use_ssl(endpoint_url)
+    endpoint_url = strip_scheme(endpoint_url)
+
+    try:
+        validate_endpoint_url(endpoint_url)
+    except ValueError as e:
+        module.fail_json(msg=str(e), **result)
+
+    client = metrics.wrap(Minio(endpoint_url, access_key=access_key, secret_key=secret_key,
+                                secure=use_ssl, cert_check=cert_check))
+
+    desired = normalize_rules(rules) if state == 'present' else []
+    try:
+        desired_config = config_from_rules(desired) if desired else None
+    except ValueError as e:
+        module.fail_json(msg=f"Invalid lifecycle rules: {str(e)}", **result)
+
+    bucket_names = list(dict.fromkeys(bucket_names))
+
+    # The plan is only valid for the same server, buckets and rules
+    plan_params = dict(endpoint_url=endpoint_url, state=state, buckets=bucket_names, rules=desired)
+    if plan_file and not module.check_mode:
+        apply_plan(module, client, result, metrics, plan_file, plan_params, desired, desired_config,
+                   max_workers, progress_file)
+        module.exit_json(**result)
+
+    def worker(bucket_name):
+        try:
+            current = read_rules(client, bucket_name)
+            action = None
+            if current != desired:
+                action = 'set' if desired else 'deleted'
+                if not module.check_mode:
+                    apply_lifecycle(client, bucket_name, desired_config)
+            progress.record(ok=True)
+            return dict(name=bucket_name, action=action), current, None
+        except S3Error as e:
+            progress.record(ok=False)
+            error = classify(e)
+            return dict(name=bucket_name), None, f"{error.code or error.status}: {error.message}"
+        except ValueError as e:
+            progress.record(ok=False)
+            return dict(name=bucket_name), None, str(e)
+
+    try:
+        with ProgressReporter(progress_file, 'minio_lifecycle') as progress:
+            progress.add_planned(len(bucket_names))
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                outcomes = list(executor.map(worker, bucket_names))
+            progress.finish(failed=any(error is not None for outcome, current, error in outcomes))
+    except OSError as e:
+        module.fail_json(msg=f"Failed to write {e.filename}: {str(e)}", **result)
+
+    failed = []
+    before = {}
+    after = {}
+    operations = []
+    for outcome, current, error in outcomes:
+        if error is not None:
+            failed.append(f"{outcome['name']}: {error}")
+            continue
+        if outcome['action']:
+            before[outcome['name']] = current
+            after[outcome['name']] = desired
+            operations.append(dict(entity=outcome['name'], action=outcome['action'], before=current,
+                                   fingerprint=fingerprint(current)))
+        result['buckets'].append(outcome)
+
+    result['changed'] = len(before) > 0
+    result['diff']['before'] = before
+    result['diff']['after'] = after
+    result['message'] = f'Lifecycle configuration changed on {len(before)} of {len(bucket_names)} buckets'
+    metrics.set_items(len(bucket_names), len(before))
+
+    if failed:
+        module.fail_json(msg=f"Failed to converge lifecycle configuration: {failed}", **result)
+
+    if plan_file:
+        write_plan(plan_file, 'minio_lifecycle', plan_params, operations)
+        result['plan'] = dict(path=plan_file, operations=len(operations), applied=False)
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
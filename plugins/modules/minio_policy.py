@@ -5,6 +5,8 @@ from minio import Minio
 from minio.error import S3Error, MinioAdminException
 from minio import MinioAdmin
 from minio.credentials import StaticProvider
+from ansible_collections.ceesios.minio.plugins.module_utils.metrics import MetricsRecorder
+from ansible_collections.ceesios.minio.plugins.module_utils.errors import NO_SUCH_POLICY, error_details, is_not_found
 import json
 import re
 import tempfile
@@ -107,6 +109,10 @@ diff:
   description: Shows before and after states
   returned: always
   type: dict
+metrics:
+  description: Client calls per API operation, slowest entities and item counts, aggregated by the ceesios.minio.minio_profile callback
+  returned: always
+  type: dict
 '''
 
 def validate_endpoint_url(endpoint_url):
@@ -140,6 +146,14 @@ def sort_yaml(yaml_str):
     sorted_data = sort_lists(data)
     return yaml.dump(sorted_data, default_flow_style=False, sort_keys=True)
 
+def read_policy_entities(client, policy_name):
+    # One read returns every user and group the policy is attached to
+    entities = json.loads(client.get_policy_entities(users=[], groups=[], policies=[policy_name]))
+    for mapping in entities.get('policyMappings') or []:
+        if mapping.get('policy') == policy_name:
+            return set(mapping.get('users') or []), set(mapping.get('groups') or [])
+    return set(), set()
+
 def run_module():
     module_args = dict(
         state=dict(type='str', required=True, choices=['present', 'absent']),
@@ -158,6 +172,8 @@ def run_module():
         message='',
         diff=dict(before='', after='')
     )
+    metrics = MetricsRecorder('minio_policy')
+    result['metrics'] = metrics.data
 
     module = AnsibleModule(
         argument_spec=module_args,
@@ -184,7 +200,7 @@ def run_module():
         module.fail_json(msg=str(e), **result)
 
     credentials = StaticProvider(access_key, secret_key)
-    client = MinioAdmin(endpoint_url, credentials=credentials, secure=use_ssl)
+    client = metrics.wrap(MinioAdmin(endpoint=endpoint_url, credentials=credentials, secure=use_ssl))
 
     policy_document_json = json.dumps({"Version": "2012-10-17", "Statement": statements})
     desired_policy = json.loads(policy_document_json)
@@ -198,9 +214,14 @@ def run_module():
             current_policy_yaml = sort_yaml(yaml.dump(current_policy, default_flow_style=False))
 
         except MinioAdminException as e:
-            if "XMinioAdminNoSuchPolicy" not in e._body:
+            if not is_not_found(e, NO_SUCH_POLICY):
                 raise
 
+        attached_users = set()
+        attached_groups = set()
+        if current_policy_yaml is not None and (users or groups):
+            attached_users, attached_groups = read_policy_entities(client, policy_name)
+
         result['diff']['before'] = current_policy_yaml
         result['diff']['after'] = desired_policy_yaml
 
@@ -216,37 +237,55 @@ def run_module():
             else:
                 result['message'] = f'Policy {policy_name} is already up to date'
 
-            if users:
-                for user in users:
-                    client.policy_set(policy_name, user=user)
-                result['message'] += f' and users {users} added'
+            users_to_set = [user for user in users or [] if user not in attached_users]
+            if users_to_set:
+                result['changed'] = True
+                if not module.check_mode:
+                    for user in users_to_set:
+                        client.policy_set(policy_name, user=user)
+                result['message'] += f' and users {users_to_set} added'
 
-            if groups:
-                for group in groups:
-                    client.policy_set(policy_name, group=group)
-                result['message'] += f' and groups {groups} added'
+            groups_to_set = [group for group in groups or [] if group not in attached_groups]
+            if groups_to_set:
+                result['changed'] = True
+                if not module.check_mode:
+                    for group in groups_to_set:
+                        client.policy_set(policy_name, group=group)
+                result['message'] += f' and groups {groups_to_set} added'
 
         elif state == 'absent':
             result['diff']['after'] = ''
+
+            # Detach before removing so the policy is no longer in use
+            users_to_unset = [user for user in users or [] if user in attached_users]
+            if users_to_unset:
+                result['changed'] = True
+                if not module.check_mode:
+                    for user in users_to_unset:
+                        client.policy_unset(policy_name, user=user)
+
+            groups_to_unset = [group for group in groups or [] if group in attached_groups]
+            if groups_to_unset:
+                result['changed'] = True
+                if not module.check_mode:
+                    for group in groups_to_unset:
+                        client.policy_unset(policy_name, group=group)
+
             if current_policy_yaml is not None:
                 result['changed'] = True
                 if not module.check_mode:
                     client.policy_remove(policy_name)
                     result['message'] = f'Policy {policy_name} deleted'
 
-            if users:
-                for user in users:
-                    client.policy_unset(policy_name, user=user)
-                result['message'] += f' and users {users} removed'
-
-            if groups:
-                for group in groups:
-                    client.policy_unset(policy_name, group=group)
-                result['message'] += f' and groups {groups} removed'
+            if users_to_unset:
+                result['message'] += f' and users {users_to_unset} removed'
+            if groups_to_unset:
+                result['message'] += f' and groups {groups_to_unset} removed'
 
     except MinioAdminException as e:
-        module.fail_json(msg=str(e), **result)
+        module.fail_json(msg=str(e), **error_details(e), **result)
 
+    metrics.set_items(1, int(result['changed']))
     module.exit_json(**result)
 
 def main():
@@ -5,7 +5,16 @@ from minio import Minio
 from minio.error import S3Error, MinioAdminException
 from minio.credentials import StaticProvider
 from minio.objectlockconfig import ObjectLockConfig, DAYS, YEARS
+from minio.commonconfig import COMPLIANCE, GOVERNANCE
+from minio.retention import Retention
+from ansible_collections.ceesios.minio.plugins.module_utils.progress import ProgressReporter
+from ansible_collections.ceesios.minio.plugins.module_utils.metrics import MetricsRecorder
+from ansible_collections.ceesios.minio.plugins.module_utils.errors import classify, error_details
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 import json
+import os
 import re
 import tempfile
 import yaml
@@ -43,16 +52,82 @@ options:
             - The name of the bucket for which to set retention.
         required: true
         type: str
+    state:
+        description:
+            - Whether the retention should be present or absent.
+            - C(absent) is only supported with I(scope=bucket).
+        required: true
+        choices: ['present', 'absent']
+        type: str
     retention_mode:
         description:
             - The retention mode (e.g., GOVERNANCE or COMPLIANCE).
-        required: true
+        required: false
         type: str
     retention_days:
         description:
             - The number of days to retain objects.
-        required: true
+            - With I(scope=objects) each object is retained until I(retention_anchor) plus this number of days.
+        required: false
+        type: int
+    retention_anchor:
+        description:
+            - Start of the retention period of each object when I(scope=objects).
+            - C(last_modified) retains each object until its last modification time plus I(retention_days). Objects
+              for which that date has already passed are skipped and counted in C(objects_expired), because the
+              server rejects a retain-until date in the past. Legal hold is still applied to them.
+            - C(now) retains objects without retention until the time of the run plus I(retention_days). Objects that
+              already have retention of I(retention_mode) are left untouched, so reruns do not extend them.
+            - Objects under C(COMPLIANCE) retention are never changed to C(GOVERNANCE), the server refuses that.
+        choices: ['last_modified', 'now']
+        default: 'last_modified'
+        type: str
+    scope:
+        description:
+            - C(bucket) sets the default object lock configuration of the bucket.
+            - C(objects) applies retention and/or legal hold to every existing object under I(prefix).
+            - Objects are listed lazily, objects whose retention or legal hold already match are skipped.
+            - Only the latest version of each object is updated.
+        choices: ['bucket', 'objects']
+        default: 'bucket'
+        type: str
+    prefix:
+        description:
+            - Only objects starting with this prefix are updated when I(scope=objects).
+        required: false
+        default: ''
+        type: str
+    legal_hold:
+        description:
+            - Enable or disable legal hold on objects when I(scope=objects).
+            - When not set, legal hold is left untouched.
+        required: false
+        type: bool
+    checkpoint_file:
+        description:
+            - Local file used to record progress when I(scope=objects).
+            - An interrupted run resumes after the last object recorded in this file.
+            - The file is removed once all objects were processed without failures.
+        required: false
+        type: path
+    checkpoint_interval:
+        description:
+            - Number of processed objects between two writes of I(checkpoint_file).
+        required: false
+        default: 1000
+        type: int
+    max_workers:
+        description:
+            - Maximum number of concurrent object requests when I(scope=objects).
+        required: false
+        default: 4
         type: int
+    progress_file:
+        description:
+            - Local file to which progress is written while I(scope=objects) runs.
+            - Read it with M(ceesios.minio.minio_job_status), for example while the task runs with C(async).
+        required: false
+        type: path
 author:
     - Cees Moerkerken (@ceesios)
 '''
@@ -66,6 +141,20 @@ EXAMPLES = r'''
     bucket_name: "example-bucket"
     retention_mode: "GOVERNANCE"
     retention_days: 30
+
+- name: Backfill retention and legal hold on existing objects
+  minio_retention:
+    endpoint_url: "http://play.min.io:9000"
+    access_key: "minio"
+    secret_key: "minio123"
+    bucket_name: "example-bucket"
+    scope: objects
+    prefix: "invoices/2024/"
+    retention_mode: "COMPLIANCE"
+    retention_days: 3650
+    legal_hold: true
+    checkpoint_file: "/var/tmp/example-bucket-invoices.checkpoint"
+    max_workers: 16
 '''
 
 RETURN = r'''
@@ -81,6 +170,35 @@ diff:
   description: Shows before and after states
   returned: always
   type: dict
+objects_scanned:
+  description: Number of objects listed
+  returned: when scope is objects
+  type: int
+objects_changed:
+  description: Number of objects whose retention or legal hold was updated
+  returned: when scope is objects
+  type: int
+objects_failed:
+  description: Number of objects that could not be updated
+  returned: when scope is objects
+  type: int
+objects_expired:
+  description: Number of objects skipped because their retention period measured from their last modification has already passed
+  returned: when scope is objects
+  type: int
+failed_objects:
+  description: Names of the first objects that could not be updated
+  returned: when scope is objects
+  type: list
+  elements: str
+resumed_after:
+  description: Object name the run resumed after, taken from I(checkpoint_file)
+  returned: when scope is objects
+  type: str
+metrics:
+  description: Client calls per API operation, slowest entities and item counts, aggregated by the ceesios.minio.minio_profile callback
+  returned: always
+  type: dict
 '''
 
 def validate_endpoint_url(endpoint_url):
@@ -109,6 +227,25 @@ def set_retention(client, bucket_name, retention_mode, retention_days):
     # Use the correct method name here:
     client.set_object_lock_config(bucket_name, lock_config)
 
+def get_retention(client, bucket_name):
+    """
+    Return the default retention of the bucket in the same form as the
+    desired configuration, or an empty dict when none is set.
+    """
+    try:
+        lock_config = client.get_object_lock_config(bucket_name)
+    except S3Error as e:
+        if classify(e).code != 'ObjectLockConfigurationNotFoundError':
+            raise
+        return {}
+    if lock_config.mode is None:
+        return {}
+    return {
+        "Mode": lock_config.mode,
+        "Duration": lock_config.duration,
+        "Unit": lock_config.duration_unit
+    }
+
 def remove_retention(client, bucket_name):
     """
     Remove object lock configuration by setting an empty ObjectLockConfig.
@@ -116,12 +253,169 @@ def remove_retention(client, bucket_name):
     lock_config = ObjectLockConfig(None, None, None)
     client.set_object_lock_config(bucket_name, lock_config)
 
+def load_checkpoint(checkpoint_file, bucket_name, prefix):
+    """
+    Return the object name to resume after, or None when there is no
+    checkpoint for this bucket and prefix.
+    """
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return None
+    with open(checkpoint_file) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("bucket") != bucket_name or checkpoint.get("prefix") != prefix:
+        return None
+    return checkpoint.get("start_after")
+
+def save_checkpoint(checkpoint_file, bucket_name, prefix, start_after):
+    """Atomically record the last object processed in listing order."""
+    tmp_path = checkpoint_file + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"bucket": bucket_name, "prefix": prefix, "start_after": start_after}, f)
+    os.replace(tmp_path, checkpoint_file)
+
+def desired_retention(current, mode, retain_until, anchor):
+    """
+    Return the retain-until date to write for an object, or None when its
+    current retention already covers the desired one.
+    """
+    if current is None or current.mode is None:
+        return retain_until
+    if current.mode == COMPLIANCE and mode == GOVERNANCE:
+        # Already stricter, and the server refuses to weaken it
+        return None
+    if current.mode == mode:
+        if anchor == 'now' or current.retain_until_date >= retain_until:
+            # With a moving anchor any existing retention counts as converged,
+            # otherwise every run would extend it
+            return None
+        return retain_until
+    # GOVERNANCE to COMPLIANCE: never shorten the existing date
+    return max(retain_until, current.retain_until_date)
+
+def converge_object(client, bucket_name, obj, retention_mode, retention_days, retention_anchor, now,
+                    legal_hold, check_mode):
+    """
+    Apply retention and legal hold to a single object. Returns a tuple of
+    whether the object was (or in check mode would be) changed and whether
+    its retention period has already elapsed.
+    """
+    changed = False
+    expired = False
+    if retention_mode:
+        mode = retention_mode.upper()
+        if retention_anchor == 'now':
+            retain_until = now + timedelta(days=retention_days)
+        else:
+            # Anchoring on last_modified keeps the desired date stable between runs
+            retain_until = obj.last_modified + timedelta(days=retention_days)
+        # The server stores whole seconds, compare at the same precision
+        retain_until = retain_until.replace(microsecond=0)
+        if retain_until <= now:
+            # The server rejects a retain-until date in the past
+            expired = True
+        else:
+            current = client.get_object_retention(bucket_name, obj.object_name)
+            retain_until = desired_retention(current, mode, retain_until, retention_anchor)
+            if retain_until is not None:
+                changed = True
+                if not check_mode:
+                    client.set_object_retention(bucket_name, obj.object_name, Retention(mode, retain_until))
+    if legal_hold is not None:
+        if client.is_object_legal_hold_enabled(bucket_name, obj.object_name) != legal_hold:
+            changed = True
+            if not check_mode:
+                if legal_hold:
+                    client.enable_object_legal_hold(bucket_name, obj.object_name)
+                else:
+                    client.disable_object_legal_hold(bucket_name, obj.object_name)
+    return changed, expired
+
+def run_objects(module, client, result, bucket_name, prefix, retention_mode, retention_days,
+                retention_anchor, legal_hold, checkpoint_file, checkpoint_interval, max_workers, progress):
+    """
+    Stream the objects under prefix through a bounded thread pool. The
+    checkpoint only advances past objects for which every earlier object in
+    listing order succeeded, so a resumed run never skips a failed object.
+    """
+    start_after = load_checkpoint(checkpoint_file, bucket_name, prefix)
+    write_checkpoints = checkpoint_file is not None and not module.check_mode
+    counters = {"scanned": 0, "changed": 0, "failed": 0, "expired": 0}
+    # One reference time per run, so all objects are compared against the same moment
+    now = datetime.now(timezone.utc)
+    failed_objects = []
+    state = {"checkpoint": start_after, "blocked": False, "since_save": 0}
+    pending = deque()
+    max_workers = max(1, max_workers)
+
+    def drain_one():
+        object_name, future = pending.popleft()
+        counters["scanned"] += 1
+        try:
+            changed, expired = future.result()
+            if changed:
+                counters["changed"] += 1
+            if expired:
+                counters["expired"] += 1
+            progress.record(ok=True)
+        except (S3Error, ValueError) as e:
+            progress.record(ok=False)
+            counters["failed"] += 1
+            state["blocked"] = True
+            if len(failed_objects) < 100:
+                failed_objects.append(f"{object_name}: {str(e)}")
+        if not state["blocked"]:
+            state["checkpoint"] = object_name
+            state["since_save"] += 1
+            if write_checkpoints and state["since_save"] >= checkpoint_interval:
+                save_checkpoint(checkpoint_file, bucket_name, prefix, state["checkpoint"])
+                state["since_save"] = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            objects = client.list_objects(bucket_name, prefix=prefix, recursive=True, start_after=start_after)
+            for obj in objects:
+                if obj.is_dir:
+                    continue
+                progress.add_planned()
+                pending.append((obj.object_name, executor.submit(
+                    converge_object, client, bucket_name, obj, retention_mode,
+                    retention_days, retention_anchor, now, legal_hold, module.check_mode)))
+                # Bound memory use: never hold more than a few batches in flight
+                if len(pending) >= max_workers * 4:
+                    drain_one()
+            while pending:
+                drain_one()
+    finally:
+        result['objects_scanned'] = counters["scanned"]
+        result['objects_changed'] = counters["changed"]
+        result['objects_failed'] = counters["failed"]
+        result['objects_expired'] = counters["expired"]
+        result['failed_objects'] = failed_objects
+        result['resumed_after'] = start_after
+        result['changed'] = counters["changed"] > 0
+        if write_checkpoints and state["checkpoint"] is not None:
+            save_checkpoint(checkpoint_file, bucket_name, prefix, state["checkpoint"])
+
+    if write_checkpoints and counters["failed"] == 0 and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+
+    result['message'] = (f"Retention applied to {counters['changed']} of {counters['scanned']} objects "
+                         f"under {bucket_name}/{prefix}")
+
 def run_module():
     module_args = dict(
         state=dict(type='str', required=True, choices=['present', 'absent']),
         bucket_name=dict(type='str', required=True),
         retention_mode=dict(type='str', required=False),
         retention_days=dict(type='int', required=False),
+        retention_anchor=dict(type='str', required=False, default='last_modified', choices=['last_modified', 'now']),
+        scope=dict(type='str', required=False, default='bucket', choices=['bucket', 'objects']),
+        prefix=dict(type='str', required=False, default=''),
+        legal_hold=dict(type='bool', required=False),
+        checkpoint_file=dict(type='path', required=False),
+        checkpoint_interval=dict(type='int', required=False, default=1000),
+        max_workers=dict(type='int', required=False, default=4),
+        progress_file=dict(type='path', required=False),
         access_key=dict(type='str', required=True, no_log=True),
         secret_key=dict(type='str', required=True, no_log=True),
         endpoint_url=dict(type='str', required=True)
@@ -133,19 +427,30 @@ def run_module():
         message='',
         diff=dict(before='', after='')
     )
+    metrics = MetricsRecorder('minio_retention')
+    result['metrics'] = metrics.data
 
     module = AnsibleModule(
         argument_spec=module_args,
         supports_check_mode=True,
         required_if=[
-            ('state', 'present', ('retention_mode', 'retention_days'), True),
+            ('state', 'present', ('retention_mode', 'retention_days', 'legal_hold'), True),
        ],
+        required_together=[('retention_mode', 'retention_days')],
     )
 
     state = module.params['state']
     bucket_name = module.params['bucket_name']
     retention_mode = module.params['retention_mode']
     retention_days = module.params['retention_days']
+    retention_anchor = module.params['retention_anchor']
+    scope = module.params['scope']
+    prefix = module.params['prefix']
+    legal_hold = module.params['legal_hold']
+    checkpoint_file = module.params['checkpoint_file']
+    checkpoint_interval = module.params['checkpoint_interval']
+    max_workers = module.params['max_workers']
+    progress_file = module.params['progress_file']
     access_key = module.params['access_key']
     secret_key = module.params['secret_key']
     endpoint_url = module.params['endpoint_url']
@@ -158,15 +463,36 @@ def run_module():
     use_ssl = derive_use_ssl(endpoint_url)
     endpoint_clean = strip_scheme(endpoint_url)
 
-    client = Minio(
+    client = metrics.wrap(Minio(
         endpoint_clean,
         access_key=access_key,
         secret_key=secret_key,
         secure=use_ssl
-    )
+    ))
 
-    # For diff support, attempt to retrieve or note existing config (not always possible).
-    current_config_json = ""
+    if scope == 'objects':
+        if state == 'absent':
+            module.fail_json(msg="state absent is not supported with scope objects", **result)
+        try:
+            with ProgressReporter(progress_file, 'minio_retention') as progress:
+                run_objects(module, client, result, bucket_name, prefix, retention_mode, retention_days,
+                            retention_anchor, legal_hold, checkpoint_file, checkpoint_interval, max_workers, progress)
+                progress.finish(failed=result['objects_failed'] > 0)
+        except S3Error as e:
+            module.fail_json(msg=str(e), **error_details(e), **result)
+        except (OSError, ValueError) as e:
+            module.fail_json(msg=str(e), **result)
+        metrics.set_items(result['objects_scanned'], result['objects_changed'])
+        if result['objects_failed']:
+            module.fail_json(msg=f"Failed to apply retention to {result['objects_failed']} objects", **result)
+        module.exit_json(**result)
+
+    # Read the current default retention so converged buckets are not rewritten
+    try:
+        current_config_data = get_retention(client, bucket_name)
+    except (S3Error, ValueError) as e:
+        module.fail_json(msg=str(e), **error_details(e), **result)
+    current_config_json = json.dumps(current_config_data, sort_keys=True)
     desired_config_json = ""
 
     if state == 'present':
@@ -180,14 +506,17 @@ def run_module():
 
             result['diff']['before'] = current_config_json
             result['diff']['after'] = desired_config_json
-            result['changed'] = True
 
-            if not module.check_mode:
-                try:
-                    set_retention(client, bucket_name, retention_mode, retention_days)
-                except (S3Error, MinioAdminException) as e:
-                    module.fail_json(msg=str(e), **result)
-            result['message'] = f"Retention set for bucket {bucket_name}"
+            if current_config_data == desired_config_data:
+                result['message'] = f"Retention already set for bucket {bucket_name}"
+            else:
+                result['changed'] = True
+                if not module.check_mode:
+                    try:
+                        set_retention(client, bucket_name, retention_mode, retention_days)
+                    except (S3Error, MinioAdminException) as e:
+                        module.fail_json(msg=str(e), **error_details(e), **result)
+                result['message'] = f"Retention set for bucket {bucket_name}"
         else:
             result['message'] = "No retention_mode or retention_days provided; nothing changed."
     else:  # absent
@@ -195,15 +524,19 @@ def run_module():
 
         result['diff']['before'] = current_config_json
         result['diff']['after'] = desired_config_json
-        result['changed'] = True
 
-        if not module.check_mode:
-            try:
-                remove_retention(client, bucket_name)
-            except (S3Error, MinioAdminException) as e:
-                module.fail_json(msg=str(e), **result)
-        result['message'] = f"Retention removed for bucket {bucket_name}"
+        if not current_config_data:
+            result['message'] = f"Retention already removed for bucket {bucket_name}"
+        else:
+            result['changed'] = True
+            if not module.check_mode:
+                try:
+                    remove_retention(client, bucket_name)
+                except (S3Error, MinioAdminException) as e:
+                    module.fail_json(msg=str(e), **error_details(e), **result)
+            result['message'] = f"Retention removed for bucket {bucket_name}"
 
+    metrics.set_items(1, int(result['changed']))
     module.exit_json(**result)
 
 def main():
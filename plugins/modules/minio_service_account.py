@@ -0,0 +1,523 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from minio.error import MinioAdminException
+from minio import MinioAdmin
+from minio.credentials import StaticProvider
+from ansible_collections.ceesios.minio.plugins.module_utils.progress import ProgressReporter
+from ansible_collections.ceesios.minio.plugins.module_utils.metrics import MetricsRecorder
+from ansible_collections.ceesios.minio.plugins.module_utils.errors import NO_SUCH_USER, classify, error_details, is_not_found
+from concurrent.futures import ThreadPoolExecutor
+import json
+import re
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['preview'],
+    'supported_by': 'community'
+}
+
+DOCUMENTATION = r'''
+---
+module: minio_service_account
+short_description: Manage MinIO service accounts
+description:
+    - This module creates, updates, and deletes service accounts (access keys) of MinIO users.
+    - The service accounts of every parent user in the task are listed with a single C(list_service_account) call,
+      missing accounts are created concurrently with their inline policy.
+    - Status and description are compared with the listing. The inline policy of an existing account is only read
+      when C(statements) is set for it, and an account is only updated when something differs.
+    - Credentials of newly created accounts, including generated ones, are returned in the result.
+options:
+    endpoint_url:
+        description:
+            - The URL of the MinIO server.
+        required: true
+        type: str
+    access_key:
+        description:
+            - Access key for MinIO.
+        required: true
+        type: str
+    secret_key:
+        description:
+            - Secret key for MinIO.
+        required: true
+        type: str
+    cert_check:
+        description:
+            - Verify the TLS certificate of the MinIO server.
+        default: true
+        type: bool
+    service_accounts:
+        description:
+            - List of service accounts to manage.
+        required: true
+        type: list
+        elements: dict
+        suboptions:
+            name:
+                description:
+                    - Name of the service account, unique per parent user.
+                    - Existing accounts are matched by C(access_key) when set, otherwise by name.
+                    - Older servers do not list the names of service accounts, set C(access_key) to manage them.
+                required: true
+                type: str
+            parent_user:
+                description:
+                    - User that owns the service account. Defaults to the user in C(access_key).
+                    - New service accounts can only be created for the user the module authenticates as, because
+                      the MinIO Python client has no option to create them for another user. Existing accounts of
+                      other users can be updated and deleted.
+                required: false
+                type: str
+            access_key:
+                description:
+                    - Access key of the service account. Generated by MinIO when not set.
+                required: false
+                type: str
+            secret_key:
+                description:
+                    - Secret key of a new service account. Generated by MinIO when not set, requires C(access_key).
+                    - Only used on creation, the secret key of an existing account is never changed.
+                required: false
+                type: str
+            description:
+                description:
+                    - Description of the service account. Left untouched when not set or empty.
+                    - An existing description can not be cleared, the MinIO API ignores an empty description.
+                required: false
+                type: str
+            statements:
+                description:
+                    - Statements of the inline policy of the service account. Left untouched when not set.
+                    - Without an inline policy the account inherits the policies of its parent user.
+                required: false
+                type: list
+                elements: dict
+            status:
+                description:
+                    - Status of the service account.
+                choices: ['enabled', 'disabled']
+                default: 'enabled'
+                type: str
+    prune:
+        description:
+            - Delete service accounts of the listed parent users that are not in C(service_accounts).
+            - Nothing is pruned when an entry of C(service_accounts) can not be matched to a single existing account.
+        default: false
+        type: bool
+    state:
+        description:
+            - The desired state of the service accounts.
+        choices: ['present', 'absent']
+        default: 'present'
+        type: str
+    max_workers:
+        description:
+            - Maximum number of concurrent service account requests.
+        required: false
+        default: 4
+        type: int
+    progress_file:
+        description:
+            - Local file to which progress is written while the task runs.
+            - Read it with M(ceesios.minio.minio_job_status), for example while the task runs with C(async).
+        required: false
+        type: path
+author:
+    - Cees Moerkerken (@ceesios)
+'''
+
+EXAMPLES = r'''
+- name: Issue service accounts for the applications
+  minio_service_account:
+    endpoint_url: "http://minio.example.com"
+    access_key: "app_owner"
+    secret_key: "app_owner_secret"
+    service_accounts:
+      - name: billing
+        description: Billing service
+        statements:
+          - Effect: Allow
+            Action:
+              - s3:GetObject
+              - s3:PutObject
+            Resource:
+              - arn:aws:s3:::billing/*
+      - name: reports
+        access_key: reports-reader
+        secret_key: reports-secret
+        status: disabled
+    max_workers: 16
+    state: "present"
+  register: issued
+  no_log: true
+
+- name: Keep only the managed service accounts of a user
+  minio_service_account:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    service_accounts:
+      - name: billing
+        parent_user: app_owner
+    prune: true
+
+- name: Delete a service account
+  minio_service_account:
+    endpoint_url: "http://minio.example.com"
+    access_key: "your_access_key"
+    secret_key: "your_secret_key"
+    service_accounts:
+      - name: reports
+        parent_user: app_owner
+    state: "absent"
+'''
+
+RETURN = r'''
+changed:
+  description: If any changes were made
+  returned: always
+  type: bool
+message:
+  description: Result message
+  returned: always
+  type: str
+diff:
+  description: Shows before and after states
+  returned: always
+  type: dict
+service_accounts:
+  description: Per service account outcome with parent user, access key, action and the changed fields
+  returned: always
+  type: list
+  elements: dict
+credentials:
+  description: Name, parent user, access key and secret key of every service account created by this task
+  returned: always
+  type: list
+  elements: dict
+metrics:
+  description: Client calls per API operation, slowest entities and item counts, aggregated by the ceesios.minio.minio_profile callback
+  returned: always
+  type: dict
+'''
+
+# The admin API reports the account status as on/off
+STATUS = {'on': 'enabled', 'off': 'disabled', 'enabled': 'enabled', 'disabled': 'disabled'}
+
+def validate_endpoint_url(endpoint_url):
+    # Ensure the endpoint URL does not contain a path
+    if re.search(r'/', endpoint_url.split('://')[-1]):
+        raise ValueError("path in endpoint is not allowed")
+
+def strip_scheme(endpoint_url):
+    # Strip https:// or http:// from the endpoint_url
+    return re.sub(r'^https?://', '', endpoint_url)
+
+def derive_use_ssl(endpoint_url):
+    # Determine if SSL should be used based on the scheme
+    return endpoint_url.startswith('https://')
+
+def normalize_policy(policy):
+    # Sort actions and resources so policies that only differ in order compare equal
+    if not policy:
+        return None
+    policy = json.loads(json.dumps(policy))
+    statements = policy.get('Statement') or []
+    if isinstance(statements, dict):
+        statements = [statements]
+    for statement in statements:
+        for key in ('Action', 'NotAction', 'Resource', 'NotResource'):
+            if isinstance(statement.get(key), str):
+                statement[key] = [statement[key]]
+            if isinstance(statement.get(key), list):
+                statement[key] = sorted(statement[key])
+    policy['Statement'] = statements
+    return policy
+
+def parse_accounts(listing, parent_user):
+    """
+    Return the accounts of a listing and whether it included their names.
+    Older servers only return the access keys.
+    """
+    accounts = []
+    named = True
+    for account in json.loads(listing or '{}').get('accounts') or []:
+        if isinstance(account, str):
+            account = {'accessKey': account}
+            named = False
+        accounts.append(dict(
+            access_key=account.get('accessKey'),
+            parent_user=account.get('parentUser') or parent_user,
+            name=account.get('name'),
+            description=account.get('description'),
+            status=STATUS.get(account.get('accountStatus')),
+        ))
+    return accounts, named
+
+def list_accounts(client, parent_user):
+    try:
+        return parse_accounts(client.list_service_account(parent_user), parent_user)
+    except MinioAdminException as e:
+        if not is_not_found(e, NO_SUCH_USER):
+            raise
+        return [], True
+
+def read_policy(client, access_key):
+    info = json.loads(client.get_service_account(access_key))
+    if info.get('impliedPolicy') or not info.get('policy'):
+        return None
+    policy = info['policy']
+    return normalize_policy(json.loads(policy) if isinstance(policy, str) else policy)
+
+def match_account(item, accounts):
+    # Match by access key when set, otherwise by name
+    if item['access_key'] is not None:
+        matches = [account for account in accounts if account['access_key'] == item['access_key']]
+    else:
+        matches = [account for account in accounts if account['name'] == item['name']]
+    if len(matches) > 1:
+        raise ValueError(f"{len(matches)} service accounts named {item['name']} exist for user {item['parent_user']}, set access_key")
+    return matches[0] if matches else None
+
+def desired_policy(item):
+    if item['statements'] is None:
+        return None
+    return normalize_policy({"Version": "2012-10-17", "Statement": item['statements']})
+
+def create_account(client, item, policy):
+    response = client.add_service_account(
+        access_key=item['access_key'],
+        secret_key=item['secret_key'],
+        name=item['name'],
+        description=item['description'],
+        policy=policy,
+        status=item['status'],
+    )
+    credentials = json.loads(response or '{}').get('credentials') or {}
+    access_key = credentials.get('accessKey') or item['access_key']
+    return dict(
+        name=item['name'],
+        parent_user=item['parent_user'],
+        access_key=access_key,
+        secret_key=credentials.get('secretKey') or item['secret_key'],
+    )
+
+def converge_account(client, item, current, state, authenticated_user, check_mode):
+    outcome = dict(name=item['name'], parent_user=item['parent_user'],
+                   access_key=current['access_key'] if current else item['access_key'],
+                   action=None, changes=[], before=None, after=None, credentials=None)
+
+    if state == 'absent':
+        if current is not None:
+            outcome['action'] = 'removed'
+            outcome['before'] = dict(current)
+            if not check_mode:
+                client.delete_service_account(current['access_key'])
+        return outcome
+
+    policy = desired_policy(item)
+    desired = dict(name=item['name'], status=item['status'])
+    if item['description'] is not None:
+        desired['description'] = item['description']
+    if policy is not None:
+        desired['policy'] = policy
+    outcome['after'] = desired
+
+    if current is None:
+        if item['parent_user'] != authenticated_user:
+            raise ValueError(f"service accounts can only be created for the authenticated user {authenticated_user}, "
+                             f"connect as {item['parent_user']} to create {item['name']}")
+        outcome['action'] = 'created'
+        if not check_mode:
+            outcome['credentials'] = create_account(client, item, policy)
+            outcome['access_key'] = outcome['credentials']['access_key']
+        return outcome
+
+    before = dict(name=current['name'], status=current['status'])
+    if 'description' in desired:
+        before['description'] = current['description']
+    if policy is not None:
+        before['policy'] = read_policy(client, current['access_key'])
+
+    changes = sorted(key for key in desired if key != 'name' and before.get(key) != desired[key])
+    if changes:
+        outcome['action'] = 'updated'
+        outcome['changes'] = changes
+        outcome['before'] = before
+        if not check_mode:
+            client.update_service_account(
+                access_key=current['access_key'],
+                description=desired['description'] if 'description' in changes else None,
+                policy=policy if 'policy' in changes else None,
+                status=('on' if item['status'] == 'enabled' else 'off') if 'status' in changes else None,
+            )
+    return outcome
+
+def prune_account(client, account, check_mode):
+    outcome = dict(name=account['name'], parent_user=account['parent_user'], access_key=account['access_key'],
+                   action='removed', changes=[], before=dict(account), after=None, credentials=None)
+    if not check_mode:
+        client.delete_service_account(account['access_key'])
+    return outcome
+
+def run_module():
+    module_args = dict(
+        state=dict(type='str', required=False, default='present', choices=['present', 'absent']),
+        access_key=dict(type='str', required=True, no_log=True),
+        secret_key=dict(type='str', required=True, no_log=True),
+        endpoint_url=dict(type='str', required=True),
+        cert_check=dict(type='bool', default=True),
+        service_accounts=dict(type='list', required=True, elements='dict', options=dict(
+            name=dict(type='str', required=True),
+            parent_user=dict(type='str', required=False),
+            access_key=dict(type='str', required=False, no_log=False),
+            secret_key=dict(type='str', required=False, no_log=True),
+            description=dict(type='str', required=False),
+            statements=dict(type='list', required=False, elements='dict'),
+            status=dict(type='str', default='enabled', choices=['enabled', 'disabled'])
+        ), required_by=dict(secret_key='access_key')),
+        prune=dict(type='bool', default=False),
+        max_workers=dict(type='int', required=False, default=4),
+        progress_file=dict(type='path', required=False)
+    )
+
+    result = dict(
+        changed=False,
+        original_message='',
+        message='',
+        diff=dict(before='', after=''),
+        service_accounts=[],
+        credentials=[]
+    )
+    metrics = MetricsRecorder('minio_service_account')
+    result['metrics'] = metrics.data
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    state = module.params['state']
+    access_key = module.params['access_key']
+    secret_key = module.params['secret_key']
+    endpoint_url = module.params['endpoint_url']
+    cert_check = module.params['cert_check']
+    service_accounts = module.params['service_accounts']
+    prune = module.params['prune']
+    max_workers = module.params['max_workers']
+    progress_file = module.params['progress_file']
+    use_ssl = derive_use_ssl(endpoint_url)
+    endpoint_url = strip_scheme(endpoint_url)
+
+    try:
+        validate_endpoint_url(endpoint_url)
+    except ValueError as e:
+        module.fail_json(msg=str(e), **result)
+
+    credentials = StaticProvider(access_key, secret_key)
+    client = metrics.wrap(MinioAdmin(endpoint=endpoint_url, credentials=credentials, secure=use_ssl, cert_check=cert_check))
+
+    for item in service_accounts:
+        item['parent_user'] = item['parent_user'] or access_key
+        # An empty description can not be sent to the server, leave it unmanaged
+        item['description'] = item['description'] or None
+    # Drop duplicates while keeping the order of the task
+    items = list({(item['parent_user'], item['name']): item for item in service_accounts}.values())
+    parent_users = list(dict.fromkeys(item['parent_user'] for item in items))
+
+    # One listing per parent user replaces a read per service account
+    try:
+        listings = dict((parent_user, list_accounts(client, parent_user)) for parent_user in parent_users)
+    except MinioAdminException as e:
+        module.fail_json(msg=f"Failed to list service accounts: {str(e)}", **error_details(e), **result)
+    existing = dict((parent_user, accounts) for parent_user, (accounts, named) in listings.items())
+
+    planned = []
+    failed = []
+    managed = set()
+    for item in items:
+        if item['access_key'] is None and not listings[item['parent_user']][1]:
+            # Matching by name would never find an existing account and create a duplicate
+            failed.append(f"{item['parent_user']}/{item['name']}: the server does not list service account names, set access_key")
+            continue
+        try:
+            current = match_account(item, existing[item['parent_user']])
+        except ValueError as e:
+            failed.append(f"{item['parent_user']}/{item['name']}: {str(e)}")
+            continue
+        if current is not None:
+            managed.add(current['access_key'])
+        planned.append((item, current))
+
+    unmanaged = []
+    # Without a match for every item it is unknown which accounts are
+    # managed, so nothing is pruned rather than deleting a managed account
+    if prune and state == 'present' and not failed:
+        unmanaged = [account for parent_user in parent_users for account in existing[parent_user]
+                     if account['access_key'] not in managed]
+
+    def worker(task):
+        item, current = task
+        entity = item or current
+        name = f"{entity['parent_user']}/{entity['name'] or entity['access_key']}"
+        try:
+            if item is None:
+                outcome = prune_account(client, current, module.check_mode)
+            else:
+                outcome = converge_account(client, item, current, state, access_key, module.check_mode)
+            progress.record(ok=True)
+            return outcome, None
+        except MinioAdminException as e:
+            progress.record(ok=False)
+            error = classify(e)
+            return None, f"{name}: {error.code or error.status}: {error.message}"
+        except ValueError as e:
+            progress.record(ok=False)
+            return None, f"{name}: {str(e)}"
+
+    tasks = planned + [(None, account) for account in unmanaged]
+    try:
+        with ProgressReporter(progress_file, 'minio_service_account') as progress:
+            progress.add_planned(len(tasks))
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                outcomes = list(executor.map(worker, tasks))
+            progress.finish(failed=bool(failed) or any(error is not None for outcome, error in outcomes))
+    except OSError as e:
+        module.fail_json(msg=f"Failed to write {e.filename}: {str(e)}", **result)
+
+    before = {}
+    after = {}
+    for outcome, error in outcomes:
+        if error is not None:
+            failed.append(error)
+            continue
+        if outcome['action']:
+            key = f"{outcome['parent_user']}/{outcome['name'] or outcome['access_key']}"
+            before[key] = outcome['before']
+            after[key] = outcome['after'] if outcome['action'] != 'removed' else None
+        if outcome['credentials']:
+            result['credentials'].append(outcome['credentials'])
+        for field in ('before', 'after', 'credentials'):
+            outcome.pop(field)
+        result['service_accounts'].append(outcome)
+
+    changed_count = len(before)
+    result['changed'] = changed_count > 0
+    result['diff']['before'] = before
+    result['diff']['after'] = after
+    result['message'] = f'{changed_count} of {len(tasks)} service accounts changed'
+    metrics.set_items(len(tasks), changed_count)
+
+    if failed:
+        module.fail_json(msg=f"Failed to converge service accounts: {failed}", **result)
+
+    module.exit_json(**result)
+
+def main():
+    run_module()
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,15 @@ from minio import Minio
 from minio.error import MinioAdminException
 from minio import MinioAdmin
 from minio.credentials import StaticProvider
+from ansible_collections.ceesios.minio.plugins.module_utils.progress import ProgressReporter
+from ansible_collections.ceesios.minio.plugins.module_utils.metrics import MetricsRecorder
+from ansible_collections.ceesios.minio.plugins.module_utils.errors import NO_SUCH_USER, classify, error_details, is_not_found
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import json
+import os
 import re
+import tempfile
 
 ANSIBLE_METADATA = {
     'metadata_version': '1.1',
@@ -36,20 +43,61 @@ options:
             - Secret key for MinIO.
         required: true
         type: str
-    user_name:
+    user_access_key:
         description:
-            - Name of the user to manage.
-        required: true
+            - Access key (name) of the user to manage.
+            - Mutually exclusive with I(users).
+        required: false
         type: str
-    password:
+    user_secret_key:
         description:
-            - Password for the user.
+            - Secret key of the user to manage.
         required: false
         type: str
+    users:
+        description:
+            - List of users to manage in a single task.
+            - Existing users are read with one C(user_list) call and changes are applied concurrently.
+            - Mutually exclusive with I(user_access_key).
+        required: false
+        type: list
+        elements: dict
+        suboptions:
+            access_key:
+                description:
+                    - Access key (name) of the user.
+                required: true
+                type: str
+            secret_key:
+                description:
+                    - Secret key of the user.
+                required: false
+                type: str
+    secret_fingerprint_file:
+        description:
+            - Path to a local file holding a salted fingerprint of the last applied secret key per user.
+            - When set, the secret key of an existing user is rotated if it differs from the recorded fingerprint.
+            - Existing users without a recorded fingerprint are rotated once so the file reflects the applied secret.
+            - When not set, the secret key of an existing user is never changed.
+            - Requires user_secret_key when state is present.
+        required: false
+        type: path
+    max_workers:
+        description:
+            - Maximum number of concurrent requests when managing I(users).
+        required: false
+        default: 4
+        type: int
+    progress_file:
+        description:
+            - Local file to which progress of I(users) is written while the task runs.
+            - Read it with M(ceesios.minio.minio_job_status), for example while the task runs with C(async).
+        required: false
+        type: path
     state:
         description:
             - The desired state of the user.
-        choices: ['present', 'absent']
+        choices: ['present', 'absent', 'disabled']
         default: 'present'
         type: str
 author:
@@ -62,8 +110,32 @@ EXAMPLES = r'''
     endpoint_url: "http://minio.example.com"
     access_key: "admin_access_key"
     secret_key: "admin_secret_key"
-    user_name: "test_user"
-    password: "test_password"
+    user_access_key: "test_user"
+    user_secret_key: "test_password"
+    state: "present"
+
+- name: Rotate the secret key of a user when it changed
+  minio_user:
+    endpoint_url: "http://minio.example.com"
+    access_key: "admin_access_key"
+    secret_key: "admin_secret_key"
+    user_access_key: "test_user"
+    user_secret_key: "new_test_password"
+    secret_fingerprint_file: "/var/lib/minio-ansible/user_secrets.json"
+    state: "present"
+
+- name: Create or rotate many users
+  minio_user:
+    endpoint_url: "http://minio.example.com"
+    access_key: "admin_access_key"
+    secret_key: "admin_secret_key"
+    users:
+      - access_key: "app1"
+        secret_key: "app1_secret"
+      - access_key: "app2"
+        secret_key: "app2_secret"
+    secret_fingerprint_file: "/var/lib/minio-ansible/user_secrets.json"
+    max_workers: 8
     state: "present"
 
 - name: Delete a user
@@ -71,7 +143,7 @@ EXAMPLES = r'''
     endpoint_url: "http://minio.example.com"
     access_key: "admin_access_key"
     secret_key: "admin_secret_key"
-    user_name: "test_user"
+    user_access_key: "test_user"
     state: "absent"
 '''
 
@@ -88,6 +160,15 @@ diff:
   description: Shows before and after states
   returned: always
   type: dict
+users:
+  description: Per user outcome when I(users) is used
+  returned: when users is set
+  type: list
+  elements: dict
+metrics:
+  description: Client calls per API operation, slowest entities and item counts, aggregated by the ceesios.minio.minio_profile callback
+  returned: always
+  type: dict
 '''
 
 def validate_endpoint_url(endpoint_url):
@@ -108,14 +189,135 @@ def set_diff(result, current, desired):
     result['diff']['before'] = current
     result['diff']['after'] = desired
 
+def fingerprint_secret(secret_key, salt):
+    # Salted SHA-256 of the secret key, the secret itself is never stored
+    return hashlib.sha256(bytes.fromhex(salt) + secret_key.encode()).hexdigest()
+
+def new_fingerprint(secret_key):
+    salt = os.urandom(16).hex()
+    return {"salt": salt, "fingerprint": fingerprint_secret(secret_key, salt)}
+
+def secret_matches(entry, secret_key):
+    # Unknown secrets never match, so they are applied once and recorded
+    if not entry or secret_key is None:
+        return False
+    return fingerprint_secret(secret_key, entry["salt"]) == entry["fingerprint"]
+
+def load_fingerprints(path):
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_fingerprints(path, fingerprints):
+    # Write to a temporary file first so an interrupted run never truncates the store
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.minio_user_')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(fingerprints, f, indent=2, sort_keys=True)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+def plan_user(state, current, secret_key, entry, track_secrets):
+    # Return the action needed to converge a single user, or None
+    if state == 'present':
+        if current is None:
+            return 'add'
+        if track_secrets and not secret_matches(entry, secret_key):
+            return 'rotate'
+    elif state == 'disabled':
+        if current is not None and current.get('status') == 'enabled':
+            return 'disable'
+    elif state == 'absent':
+        if current is not None:
+            return 'remove'
+    return None
+
+def apply_user(client, action, user_access_key, user_secret_key):
+    if action in ('add', 'rotate'):
+        client.user_add(user_access_key, user_secret_key)
+    elif action == 'disable':
+        client.user_disable(user_access_key)
+    elif action == 'remove':
+        client.user_remove(user_access_key)
+
+def run_bulk(module, client, result, users, state, fingerprints, track_secrets, max_workers, progress):
+    # One listing call replaces a user_info call per user
+    existing = json.loads(client.user_list())
+
+    planned = []
+    seen = set()
+    for user in users:
+        user_access_key = user['access_key']
+        if user_access_key in seen:
+            continue
+        seen.add(user_access_key)
+        if state == 'present' and user.get('secret_key') is None:
+            module.fail_json(msg=f"secret_key is required for user {user_access_key} when state is present", **result)
+        action = plan_user(state, existing.get(user_access_key), user.get('secret_key'),
+                           fingerprints.get(user_access_key), track_secrets)
+        planned.append((user_access_key, user.get('secret_key'), action))
+
+    outcomes = []
+    failed = []
+
+    def worker(item):
+        user_access_key, user_secret_key, action = item
+        try:
+            apply_user(client, action, user_access_key, user_secret_key)
+            progress.record(ok=True)
+            return user_access_key, user_secret_key, action, None
+        except MinioAdminException as e:
+            progress.record(ok=False)
+            error = classify(e)
+            return user_access_key, user_secret_key, action, f"{error.code or error.status}: {error.message}"
+
+    to_apply = [item for item in planned if item[2] is not None]
+    progress.add_planned(len(to_apply))
+    if module.check_mode:
+        applied = [(k, s, a, None) for k, s, a in to_apply]
+    else:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            applied = list(executor.map(worker, to_apply))
+
+    for user_access_key, user_secret_key, action, error in applied:
+        if error is not None:
+            failed.append(user_access_key)
+            outcomes.append(dict(access_key=user_access_key, action=action, failed=True, error=error))
+            continue
+        if action in ('add', 'rotate') and track_secrets:
+            fingerprints[user_access_key] = new_fingerprint(user_secret_key)
+        elif action == 'remove':
+            fingerprints.pop(user_access_key, None)
+        outcomes.append(dict(access_key=user_access_key, action=action, failed=False))
+
+    result['users'] = outcomes
+    result['changed'] = any(not outcome['failed'] for outcome in outcomes)
+    result['diff']['before'] = {k: existing.get(k, {}).get('status') for k, s, a in to_apply}
+    result['diff']['after'] = {k: (None if a == 'remove' else 'disabled' if a == 'disable' else 'enabled')
+                               for k, s, a in to_apply}
+    result['message'] = f'{len(to_apply)} of {len(planned)} users changed'
+    return failed
+
 def run_module():
     module_args = dict(
         state=dict(type='str', required=True, choices=['present', 'absent', 'disabled']),
         access_key=dict(type='str', required=True),
         secret_key=dict(type='str', required=True, no_log=True),
         endpoint_url=dict(type='str', required=True),
-        user_access_key=dict(type='str', required=True),
-        user_secret_key=dict(type='str', required=False, no_log=True)
+        user_access_key=dict(type='str', required=False),
+        user_secret_key=dict(type='str', required=False, no_log=True),
+        users=dict(type='list', required=False, elements='dict', options=dict(
+            access_key=dict(type='str', required=True),
+            secret_key=dict(type='str', required=False, no_log=True)
+        )),
+        secret_fingerprint_file=dict(type='path', required=False),
+        max_workers=dict(type='int', required=False, default=4),
+        progress_file=dict(type='path', required=False)
     )
 
     result = dict(
@@ -124,13 +326,17 @@ def run_module():
         message='',
         diff=dict(before='', after='')
     )
+    metrics = MetricsRecorder('minio_user')
+    result['metrics'] = metrics.data
 
     module = AnsibleModule(
         argument_spec=module_args,
         supports_check_mode=True,
         required_if=[
-            ('state', 'present', ('user_access_key', 'user_secret_key'), True),
+            ('state', 'present', ('user_access_key', 'user_secret_key', 'users'), True),
        ],
+        required_one_of=[('user_access_key', 'users')],
+        mutually_exclusive=[('user_access_key', 'users')],
     )
 
     state = module.params['state']
@@ -139,6 +345,11 @@ def run_module():
     endpoint_url = module.params['endpoint_url']
     user_access_key = module.params['user_access_key']
     user_secret_key = module.params['user_secret_key']
+    users = module.params['users']
+    secret_fingerprint_file = module.params['secret_fingerprint_file']
+    max_workers = module.params['max_workers']
+    progress_file = module.params['progress_file']
+    track_secrets = secret_fingerprint_file is not None
     use_ssl = derive_use_ssl(endpoint_url)
     endpoint_url = strip_scheme(endpoint_url)
 
@@ -148,16 +359,41 @@ def run_module():
         module.fail_json(msg=str(e), **result)
 
     credentials = StaticProvider(access_key, secret_key)
-    client = MinioAdmin(endpoint_url, credentials=credentials, secure=use_ssl)
+    client = metrics.wrap(MinioAdmin(endpoint=endpoint_url, credentials=credentials, secure=use_ssl))
+
+    try:
+        fingerprints = load_fingerprints(secret_fingerprint_file)
+    except (OSError, ValueError) as e:
+        module.fail_json(msg=f"Failed to read secret fingerprint file {secret_fingerprint_file}: {str(e)}", **result)
+
+    if users is not None:
+        failed = None
+        try:
+            with ProgressReporter(progress_file, 'minio_user') as progress:
+                failed = run_bulk(module, client, result, users, state, fingerprints, track_secrets, max_workers, progress)
+                if track_secrets and result['changed'] and not module.check_mode:
+                    save_fingerprints(secret_fingerprint_file, fingerprints)
+                progress.finish(failed=bool(failed))
+        except MinioAdminException as e:
+            module.fail_json(msg=str(e), **error_details(e), **result)
+        except OSError as e:
+            module.fail_json(msg=f"Failed to write {e.filename}: {str(e)}", **result)
+        metrics.set_items(len(set(user['access_key'] for user in users)), len(result['users']) - len(failed))
+        if failed:
+            module.fail_json(msg=f"Failed to converge users: {failed}", **result)
+        module.exit_json(**result)
+
+    if state == 'present' and track_secrets and user_secret_key is None:
+        module.fail_json(msg="user_secret_key is required when state is present and secret_fingerprint_file is set", **result)
 
     try:
         user_info = None
         user_exists = False
         try:
-            user_info = client.user_info(user_access_key)
+            user_info = json.loads(client.user_info(user_access_key))
             user_exists = True
         except MinioAdminException as e:
-            if "XMinioAdminNoSuchUser" not in e._body:
+            if not is_not_found(e, NO_SUCH_USER):
                 raise
 
         current = user_info if user_exists else None
@@ -175,7 +411,18 @@ def run_module():
                         client.user_add(user_access_key, user_secret_key)
                         result['message'] = f'User {user_access_key} added'
                     except MinioAdminException as e:
-                        module.fail_json(msg=f"Failed to add user {user_access_key}: {str(e)}", **result)
+                        module.fail_json(msg=f"Failed to add user {user_access_key}: {str(e)}", **error_details(e), **result)
+                    if track_secrets:
+                        fingerprints[user_access_key] = new_fingerprint(user_secret_key)
+            elif track_secrets and not secret_matches(fingerprints.get(user_access_key), user_secret_key):
+                set_diff(result, {"access_key": user_access_key, "secret_key": "VALUE_SPECIFIED_IN_NO_LOG_PARAMETER"}, desired)
+                if not module.check_mode:
+                    try:
+                        client.user_add(user_access_key, user_secret_key)
+                        result['message'] = f'User {user_access_key} secret key rotated'
+                    except MinioAdminException as e:
+                        module.fail_json(msg=f"Failed to rotate secret key of user {user_access_key}: {str(e)}", **error_details(e), **result)
+                    fingerprints[user_access_key] = new_fingerprint(user_secret_key)
             else:
                 result['message'] = f'User {user_access_key} already exists'
         elif state == 'disabled':
@@ -183,14 +430,13 @@ def run_module():
                 current_status = current.get('status')
                 desired_status = 'disabled'
                 if current_status != desired_status:
-                    current['status'] = desired_status
-                    set_diff(result, user_info, current)
+                    set_diff(result, user_info, dict(current, status=desired_status))
                     if not module.check_mode:
                         try:
                             client.user_disable(user_access_key)
                             result['message'] = f'User {user_access_key} disabled'
                         except MinioAdminException as e:
-                            module.fail_json(msg=f"Failed to disable user {user_access_key}: {str(e)}", **result)
+                            module.fail_json(msg=f"Failed to disable user {user_access_key}: {str(e)}", **error_details(e), **result)
             else:
                 result['message'] = f'User {user_access_key} is already disabled or does not exist. User info: {user_info}'
         elif state == 'absent':
@@ -201,12 +447,20 @@ def run_module():
                         client.user_remove(user_access_key)
                         result['message'] = f'User {user_access_key} removed'
                     except MinioAdminException as e:
-                        module.fail_json(msg=f"Failed to remove user {user_access_key}: {str(e)}", **result)
+                        module.fail_json(msg=f"Failed to remove user {user_access_key}: {str(e)}", **error_details(e), **result)
+                    fingerprints.pop(user_access_key, None)
             else:
                 result['message'] = f'User {user_access_key} does not exist. User info: {user_info}'
     except MinioAdminException as e:
-        module.fail_json(msg=str(e), **result)
+        module.fail_json(msg=str(e), **error_details(e), **result)
+
+    if track_secrets and result['changed'] and not module.check_mode:
+        try:
+            save_fingerprints(secret_fingerprint_file, fingerprints)
+        except OSError as e:
+            module.fail_json(msg=f"Failed to write secret fingerprint file {secret_fingerprint_file}: {str(e)}", **result)
 
+    metrics.set_items(1, int(result['changed']))
     module.exit_json(**result)
 
 def main():
@@ -0,0 +1,514 @@
+# Offline API call-budget tests.
+#
+# Every module runs against a recording fake of the MinIO S3 and admin
+# clients. Tests assert the exact number of reads and writes per scenario so
+# that extra calls per entity are caught before release.
+#
+# Run with: python -m pytest tests/unit
+
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import pytest
+
+from minio.commonconfig import COMPLIANCE, GOVERNANCE, Tags
+from minio.error import MinioAdminException, S3Error
+from minio.objectlockconfig import ObjectLockConfig
+from minio.retention import Retention
+from minio.versioningconfig import VersioningConfig, OFF
+
+COLLECTION_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def _collections_path():
+    # Import the collection as ansible_collections.ceesios.minio, either from
+    # its install location or through a temporary symlink to this checkout
+    parts = COLLECTION_ROOT.split(os.sep)
+    if parts[-3:] == ['ansible_collections', 'ceesios', 'minio']:
+        return os.sep.join(parts[:-3])
+    path = tempfile.mkdtemp(prefix='minio_collection_')
+    os.makedirs(os.path.join(path, 'ansible_collections', 'ceesios'))
+    os.symlink(COLLECTION_ROOT, os.path.join(path, 'ansible_collections', 'ceesios', 'minio'))
+    return path
+
+
+sys.path.insert(0, _collections_path())
+
+from ansible.module_utils import basic  # noqa: E402
+
+try:
+    from ansible.module_utils.testing import patch_module_args
+except ImportError:  # ansible-core < 2.19
+    import contextlib
+    from unittest import mock
+
+    @contextlib.contextmanager
+    def patch_module_args(args):
+        with mock.patch.object(basic, '_ANSIBLE_ARGS', json.dumps({'ANSIBLE_MODULE_ARGS': args}).encode()):
+            yield
+
+
+CONNECTION = dict(
+    endpoint_url='http://minio.example.com',
+    access_key='admin',
+    secret_key='admin-secret',
+)
+
+READ_OPERATIONS = frozenset([
+    'user_info', 'user_list', 'group_info', 'group_list', 'policy_info', 'policy_list',
+    'get_policy_entities', 'bucket_quota_get', 'list_service_account', 'get_service_account',
+    'list_buckets', 'bucket_exists', 'get_bucket_versioning', 'get_bucket_tags',
+    'get_object_lock_config', 'get_bucket_lifecycle', 'list_objects', 'get_object_retention',
+    'is_object_legal_hold_enabled',
+])
+
+
+class _Response:
+    def __init__(self, status):
+        self.status = status
+
+
+def admin_not_found(code, message='not found'):
+    return MinioAdminException('404', json.dumps({'Code': code, 'Message': message}))
+
+
+def s3_error(code, status=404):
+    return S3Error(_Response(status), code, code, None, None, None)
+
+
+class FakeObject:
+    def __init__(self, name, last_modified):
+        self.object_name = name
+        self.last_modified = last_modified
+        self.is_dir = False
+
+
+class FakeCluster:
+    """In-memory MinIO state shared by the fake S3 and admin clients."""
+
+    def __init__(self):
+        self.users = {}
+        self.groups = {}
+        self.policies = {}
+        self.policy_users = {}
+        self.policy_groups = {}
+        self.buckets = {}
+        self.service_accounts = {}
+        # Older servers only list the access keys of service accounts
+        self.service_account_names = True
+        self.calls = []
+        # Operation name -> exception raised by the fake clients
+        self.failures = {}
+
+    # Seeding helpers
+
+    def add_service_account(self, access_key, name, parent='admin', status='on', policy=None, description=None):
+        self.service_accounts[access_key] = dict(
+            parent=parent, name=name, description=description, status=status, policy=policy, secret_key=None)
+        return self.service_accounts[access_key]
+
+    def add_bucket(self, name, object_lock=False, versioning=OFF, quota=0, tags=None):
+        self.buckets[name] = dict(
+            object_lock=object_lock, versioning=versioning, quota=quota,
+            tags=dict(tags or {}), lifecycle=None, lock_config=None, objects={},
+        )
+        return self.buckets[name]
+
+    # Call accounting
+
+    def record(self, operation, *args):
+        self.calls.append((operation, args))
+        if operation in self.failures:
+            raise self.failures[operation]
+
+    def reads(self):
+        return [call for call in self.calls if call[0] in READ_OPERATIONS]
+
+    def writes(self):
+        return [call for call in self.calls if call[0] not in READ_OPERATIONS]
+
+    def operations(self):
+        return [call[0] for call in self.calls]
+
+
+class FakeAdmin:
+    def __init__(self, cluster):
+        self._cluster = cluster
+
+    def _record(self, operation, *args):
+        self._cluster.record(operation, *args)
+
+    def user_info(self, access_key):
+        self._record('user_info', access_key)
+        if access_key not in self._cluster.users:
+            raise admin_not_found('XMinioAdminNoSuchUser')
+        return json.dumps({'status': self._cluster.users[access_key]['status']})
+
+    def user_list(self):
+        self._record('user_list')
+        return json.dumps(dict((name, {'status': user['status']}) for name, user in self._cluster.users.items()))
+
+    def user_add(self, access_key, secret_key):
+        self._record('user_add', access_key)
+        self._cluster.users[access_key] = {'secretKey': secret_key, 'status': 'enabled'}
+        return ''
+
+    def user_disable(self, access_key):
+        self._record('user_disable', access_key)
+        self._cluster.users[access_key]['status'] = 'disabled'
+        return ''
+
+    def user_enable(self, access_key):
+        self._record('user_enable', access_key)
+        self._cluster.users[access_key]['status'] = 'enabled'
+        return ''
+
+    def user_remove(self, access_key):
+        self._record('user_remove', access_key)
+        del self._cluster.users[access_key]
+        return ''
+
+    def group_info(self, group_name):
+        self._record('group_info', group_name)
+        if group_name not in self._cluster.groups:
+            raise admin_not_found('XMinioAdminNoSuchGroup')
+        group = self._cluster.groups[group_name]
+        return json.dumps({
+            'name': group_name,
+            'status': group['status'],
+            'members': sorted(group['members']) or None,
+            'policy': ','.join(sorted(group['policies'])),
+            'updatedAt': '2024-01-01T00:00:00Z',
+        })
+
+    def group_add(self, group_name, members):
+        self._record('group_add', group_name)
+        group = self._cluster.groups.setdefault(
+            group_name, {'status': 'enabled', 'members': set(), 'policies': set()})
+        group['members'].update(members or [])
+        return ''
+
+    def group_remove(self, group_name, members=None):
+        self._record('group_remove', group_name)
+        if members is None:
+            del self._cluster.groups[group_name]
+        else:
+            self._cluster.groups[group_name]['members'].difference_update(members)
+        return ''
+
+    def group_enable(self, group_name):
+        self._record('group_enable', group_name)
+        self._cluster.groups[group_name]['status'] = 'enabled'
+        return ''
+
+    def group_disable(self, group_name):
+        self._record('group_disable', group_name)
+        self._cluster.groups[group_name]['status'] = 'disabled'
+        return ''
+
+    def policy_info(self, policy_name):
+        self._record('policy_info', policy_name)
+        if policy_name not in self._cluster.policies:
+            raise admin_not_found('XMinioAdminNoSuchPolicy')
+        return json.dumps(self._cluster.policies[policy_name])
+
+    def policy_add(self, policy_name, policy_file=None, policy=None):
+        self._record('policy_add', policy_name)
+        if policy_file is not None:
+            with open(policy_file) as f:
+                policy = json.load(f)
+        self._cluster.policies[policy_name] = policy
+        return ''
+
+    def policy_remove(self, policy_name):
+        self._record('policy_remove', policy_name)
+        del self._cluster.policies[policy_name]
+        return ''
+
+    def policy_set(self, policy_name, user=None, group=None):
+        self._record('policy_set', policy_name)
+        self._attach(policy_name, user, group)
+        return ''
+
+    def policy_unset(self, policy_name, user=None, group=None):
+        self._record('policy_unset', policy_name)
+        self._detach(policy_name, user, group)
+        return ''
+
+    def attach_policy(self, policies, user=None, group=None):
+        self._record('attach_policy', user or group)
+        for policy_name in policies:
+            self._attach(policy_name, user, group)
+        return ''
+
+    def detach_policy(self, policies, user=None, group=None):
+        self._record('detach_policy', user or group)
+        for policy_name in policies:
+            self._detach(policy_name, user, group)
+        return ''
+
+    def _attach(self, policy_name, user, group):
+        if user is not None:
+            self._cluster.policy_users.setdefault(policy_name, set()).add(user)
+        if group is not None:
+            self._cluster.policy_groups.setdefault(policy_name, set()).add(group)
+            if group in self._cluster.groups:
+                self._cluster.groups[group]['policies'].add(policy_name)
+
+    def _detach(self, policy_name, user, group):
+        if user is not None:
+            self._cluster.policy_users.get(policy_name, set()).discard(user)
+        if group is not None:
+            self._cluster.policy_groups.get(policy_name, set()).discard(group)
+            if group in self._cluster.groups:
+                self._cluster.groups[group]['policies'].discard(policy_name)
+
+    def get_policy_entities(self, users, groups, policies):
+        self._record('get_policy_entities', *policies)
+        return json.dumps({'policyMappings': [
+            {'policy': name,
+             'users': sorted(self._cluster.policy_users.get(name, [])),
+             'groups': sorted(self._cluster.policy_groups.get(name, []))}
+            for name in policies]})
+
+    def list_service_account(self, user):
+        self._record('list_service_account', user)
+        if not self._cluster.service_account_names:
+            return json.dumps({'accounts': [
+                access_key for access_key, account in sorted(self._cluster.service_accounts.items())
+                if account['parent'] == user]})
+        return json.dumps({'accounts': [
+            {'parentUser': account['parent'], 'accountStatus': account['status'], 'accessKey': access_key,
+             'name': account['name'], 'description': account['description']}
+            for access_key, account in sorted(self._cluster.service_accounts.items())
+            if account['parent'] == user]})
+
+    def get_service_account(self, access_key):
+        self._record('get_service_account', access_key)
+        if access_key not in self._cluster.service_accounts:
+            raise admin_not_found('XMinioAdminServiceAccountNotFound')
+        account = self._cluster.service_accounts[access_key]
+        return json.dumps({
+            'parentUser': account['parent'], 'accountStatus': account['status'],
+            'impliedPolicy': account['policy'] is None,
+            'policy': json.dumps(account['policy']) if account['policy'] else '',
+            'name': account['name'], 'description': account['description'],
+        })
+
+    def add_service_account(self, *, access_key=None, secret_key=None, name=None, description=None,
+                            policy=None, policy_file=None, expiration=None, status=None):
+        self._record('add_service_account', access_key)
+        # Same argument checks as minio-py
+        if (access_key is None) ^ (secret_key is None):
+            raise ValueError("both access key and secret key must be provided")
+        if access_key is None:
+            access_key = 'SA%04d' % len(self._cluster.service_accounts)
+            secret_key = 'generated-secret-%s' % access_key
+        # Service accounts are always created for the authenticated user
+        self._cluster.service_accounts[access_key] = dict(
+            parent=CONNECTION['access_key'], name=name, description=description,
+            status='off' if status == 'disabled' else 'on', policy=policy, secret_key=secret_key)
+        return json.dumps({'credentials': {'accessKey': access_key, 'secretKey': secret_key}})
+
+    def update_service_account(self, *, access_key, secret_key=None, name=None, description=None,
+                               policy_file=None, policy=None, expiration=None, status=None):
+        self._record('update_service_account', access_key)
+        # minio-py only sends truthy fields and refuses an update without any
+        if not any([secret_key, name, description, policy_file, policy, expiration, status]):
+            raise ValueError("at least one of secret_key, name, description, policy_file, policy, "
+                             "expiration or status must be specified")
+        account = self._cluster.service_accounts[access_key]
+        if description:
+            account['description'] = description
+        if policy:
+            account['policy'] = policy
+        if status:
+            account['status'] = status
+        return ''
+
+    def delete_service_account(self, access_key):
+        self._record('delete_service_account', access_key)
+        del self._cluster.service_accounts[access_key]
+        return ''
+
+    def bucket_quota_get(self, bucket):
+        self._record('bucket_quota_get', bucket)
+        quota = self._cluster.buckets[bucket]['quota']
+        # Servers answer for a bucket without quota with an error or a null body
+        if quota is None:
+            raise admin_not_found('XMinioAdminNoSuchQuotaConfiguration')
+        if quota == 'null':
+            return 'null'
+        return json.dumps({'quota': quota, 'quotatype': 'hard'})
+
+    def bucket_quota_set(self, bucket, size):
+        self._record('bucket_quota_set', bucket)
+        self._cluster.buckets[bucket]['quota'] = size
+        return ''
+
+
+class FakeS3:
+    def __init__(self, cluster):
+        self._cluster = cluster
+
+    def _record(self, operation, *args):
+        self._cluster.record(operation, *args)
+
+    def _bucket(self, bucket_name):
+        if bucket_name not in self._cluster.buckets:
+            raise s3_error('NoSuchBucket')
+        return self._cluster.buckets[bucket_name]
+
+    def list_buckets(self):
+        self._record('list_buckets')
+        return [type('Bucket', (), {'name': name})() for name in sorted(self._cluster.buckets)]
+
+    def bucket_exists(self, bucket_name):
+        self._record('bucket_exists', bucket_name)
+        return bucket_name in self._cluster.buckets
+
+    def make_bucket(self, bucket_name, location=None, object_lock=False):
+        self._record('make_bucket', bucket_name)
+        bucket = self._cluster.add_bucket(bucket_name, object_lock=object_lock)
+        if object_lock:
+            bucket['versioning'] = 'Enabled'
+            bucket['lock_config'] = ObjectLockConfig(None, None, None)
+
+    def remove_bucket(self, bucket_name):
+        self._record('remove_bucket', bucket_name)
+        self._bucket(bucket_name)
+        del self._cluster.buckets[bucket_name]
+
+    def get_bucket_versioning(self, bucket_name):
+        self._record('get_bucket_versioning', bucket_name)
+        return VersioningConfig(self._bucket(bucket_name)['versioning'])
+
+    def set_bucket_versioning(self, bucket_name, config):
+        self._record('set_bucket_versioning', bucket_name)
+        self._bucket(bucket_name)['versioning'] = config.status
+
+    def get_bucket_tags(self, bucket_name):
+        self._record('get_bucket_tags', bucket_name)
+        tags = self._bucket(bucket_name)['tags']
+        if not tags:
+            return None
+        bucket_tags = Tags.new_bucket_tags()
+        bucket_tags.update(tags)
+        return bucket_tags
+
+    def set_bucket_tags(self, bucket_name, tags):
+        self._record('set_bucket_tags', bucket_name)
+        self._bucket(bucket_name)['tags'] = dict(tags)
+
+    def delete_bucket_tags(self, bucket_name):
+        self._record('delete_bucket_tags', bucket_name)
+        self._bucket(bucket_name)['tags'] = {}
+
+    def get_object_lock_config(self, bucket_name):
+        self._record('get_object_lock_config', bucket_name)
+        bucket = self._bucket(bucket_name)
+        if not bucket['object_lock']:
+            raise s3_error('ObjectLockConfigurationNotFoundError')
+        return bucket['lock_config'] or ObjectLockConfig(None, None, None)
+
+    def set_object_lock_config(self, bucket_name, config):
+        self._record('set_object_lock_config', bucket_name)
+        self._bucket(bucket_name)['lock_config'] = config
+
+    def get_bucket_lifecycle(self, bucket_name):
+        self._record('get_bucket_lifecycle', bucket_name)
+        return self._bucket(bucket_name)['lifecycle']
+
+    def set_bucket_lifecycle(self, bucket_name, config):
+        self._record('set_bucket_lifecycle', bucket_name)
+        self._bucket(bucket_name)['lifecycle'] = config
+
+    def delete_bucket_lifecycle(self, bucket_name):
+        self._record('delete_bucket_lifecycle', bucket_name)
+        self._bucket(bucket_name)['lifecycle'] = None
+
+    def list_objects(self, bucket_name, prefix=None, recursive=False, start_after=None, **kwargs):
+        self._record('list_objects', bucket_name)
+        objects = self._bucket(bucket_name)['objects']
+        for name in sorted(objects):
+            if prefix and not name.startswith(prefix):
+                continue
+            if start_after is not None and name <= start_after:
+                continue
+            yield FakeObject(name, objects[name]['last_modified'])
+
+    def get_object_retention(self, bucket_name, object_name, version_id=None):
+        self._record('get_object_retention', bucket_name)
+        return self._bucket(bucket_name)['objects'][object_name].get('retention')
+
+    def set_object_retention(self, bucket_name, object_name, config, version_id=None):
+        self._record('set_object_retention', bucket_name)
+        obj = self._bucket(bucket_name)['objects'][object_name]
+        # Same checks as the server: no past dates and no weakening of COMPLIANCE
+        if config.retain_until_date <= datetime.now(timezone.utc):
+            raise s3_error('InvalidRequest', 400)
+        current = obj.get('retention')
+        if current is not None and current.mode == COMPLIANCE and config.mode == GOVERNANCE:
+            raise s3_error('AccessDenied', 403)
+        # Retain-until dates are stored in RFC3339 with whole seconds
+        obj['retention'] = Retention(config.mode, config.retain_until_date.replace(microsecond=0))
+
+    def is_object_legal_hold_enabled(self, bucket_name, object_name, version_id=None):
+        self._record('is_object_legal_hold_enabled', bucket_name)
+        return self._bucket(bucket_name)['objects'][object_name].get('legal_hold', False)
+
+    def enable_object_legal_hold(self, bucket_name, object_name, version_id=None):
+        self._record('enable_object_legal_hold', bucket_name)
+        self._bucket(bucket_name)['objects'][object_name]['legal_hold'] = True
+
+    def disable_object_legal_hold(self, bucket_name, object_name, version_id=None):
+        self._record('disable_object_legal_hold', bucket_name)
+        self._bucket(bucket_name)['objects'][object_name]['legal_hold'] = False
+
+
+class ModuleExit(Exception):
+    def __init__(self, result, failed):
+        super(ModuleExit, self).__init__(result)
+        self.result = result
+        self.failed = failed
+
+
+@pytest.fixture
+def cluster():
+    return FakeCluster()
+
+
+@pytest.fixture
+def run(cluster, monkeypatch):
+    """
+    Run a module against the fake cluster. Returns the module result; the
+    recorded calls of that run are available on the cluster fixture.
+    """
+    def exit_json(self, **kwargs):
+        raise ModuleExit(kwargs, False)
+
+    def fail_json(self, **kwargs):
+        raise ModuleExit(kwargs, True)
+
+    monkeypatch.setattr(basic.AnsibleModule, 'exit_json', exit_json)
+    monkeypatch.setattr(basic.AnsibleModule, 'fail_json', fail_json)
+
+    def _run(module, args, check_mode=False, expect_failure=False):
+        if hasattr(module, 'MinioAdmin'):
+            monkeypatch.setattr(module, 'MinioAdmin', lambda *a, **kw: FakeAdmin(cluster))
+        if hasattr(module, 'Minio'):
+            monkeypatch.setattr(module, 'Minio', lambda *a, **kw: FakeS3(cluster))
+        module_args = dict(CONNECTION, **args)
+        if check_mode:
+            module_args['_ansible_check_mode'] = True
+        cluster.calls = []
+        with patch_module_args(module_args):
+            with pytest.raises(ModuleExit) as exc:
+                module.main()
+        assert exc.value.failed == expect_failure, exc.value.result.get('msg')
+        return exc.value.result
+
+    return _run
@@ -0,0 +1,116 @@
+import json
+
+from ansible_collections.ceesios.minio.plugins.callback import minio_profile
+
+
+class Task:
+    def __init__(self, name, action):
+        self._uuid = name
+        self.action = action
+        self._name = name
+
+    def get_name(self):
+        return self._name
+
+
+class Host:
+    def get_name(self):
+        return 'localhost'
+
+
+class Result:
+    def __init__(self, task, data):
+        self._task = task
+        self._host = Host()
+        self._result = data
+
+
+class Display:
+    def __init__(self):
+        self.lines = []
+
+    def banner(self, msg):
+        self.lines.append(msg)
+
+    def display(self, msg):
+        self.lines.append(msg)
+
+
+def metrics(calls, entities=None, items=1, changed_items=0):
+    return dict(calls=dict((op, dict(count=count, errors=0, seconds=0.5 * count)) for op, count in calls.items()),
+                entities=entities or {}, items=items, changed_items=changed_items)
+
+
+def new_callback(options):
+    callback = minio_profile.CallbackModule()
+    callback.get_option = options.get
+    callback._display = Display()
+    return callback
+
+
+def run_task(callback, task, data):
+    callback.v2_playbook_on_task_start(task, False)
+    callback.v2_runner_on_ok(Result(task, data))
+
+
+def test_aggregates_per_module_and_operation():
+    callback = new_callback(dict(top=10, output_file=None))
+
+    run_task(callback, Task('create users', 'ceesios.minio.minio_user'), dict(
+        changed=True, metrics=metrics({'user_list': 1, 'user_add': 4}, {'app1': 0.2}, items=4, changed_items=4)))
+    run_task(callback, Task('converge users', 'minio_user'), dict(
+        changed=False, metrics=metrics({'user_list': 1}, items=4)))
+    # Loops report the metrics of every item
+    run_task(callback, Task('groups', 'minio_group'), dict(changed=True, results=[
+        dict(metrics=metrics({'group_info': 1, 'group_add': 1}, changed_items=1)),
+        dict(metrics=metrics({'group_info': 1})),
+    ]))
+    # Tasks of other modules are ignored
+    run_task(callback, Task('debug', 'ansible.builtin.debug'), dict(changed=False))
+
+    summary = callback._summary()
+
+    user = summary['modules']['minio_user']
+    assert (user['tasks'], user['changed'], user['calls'], user['items'], user['changed_items']) == (2, 1, 6, 8, 4)
+    assert user['calls_per_changed_item'] == 1.5
+    assert summary['modules']['minio_group']['calls'] == 3
+    assert summary['operations']['minio_user.user_list']['count'] == 2
+    assert summary['operations']['minio_group.group_info']['count'] == 2
+    assert summary['slowest_entities'] == [{'entity': 'minio_user:app1', 'seconds': 0.2}]
+    assert len(summary['slowest_tasks']) == 3
+
+
+def test_top_limits_slowest_tasks_and_entities():
+    callback = new_callback(dict(top=2, output_file=None))
+
+    for i in range(5):
+        run_task(callback, Task('task%d' % i, 'minio_bucket'), dict(
+            changed=False, metrics=metrics({'list_buckets': 1}, {'bucket%d' % i: i})))
+
+    summary = callback._summary()
+
+    assert len(summary['slowest_tasks']) == 2
+    assert [entity['entity'] for entity in summary['slowest_entities']] == ['minio_bucket:bucket4', 'minio_bucket:bucket3']
+
+
+def test_writes_json_report(tmp_path):
+    output_file = tmp_path / 'profile.json'
+    callback = new_callback(dict(top=10, output_file=str(output_file)))
+    run_task(callback, Task('lifecycle', 'minio_lifecycle'), dict(
+        changed=True, metrics=metrics({'get_bucket_lifecycle': 3, 'set_bucket_lifecycle': 1}, changed_items=1)))
+
+    callback.v2_playbook_on_stats(None)
+
+    report = json.loads(output_file.read_text())
+    assert report['modules']['minio_lifecycle']['calls'] == 4
+    assert 'MINIO PROFILE' in callback._display.lines
+
+
+def test_no_output_without_minio_tasks(tmp_path):
+    output_file = tmp_path / 'profile.json'
+    callback = new_callback(dict(top=10, output_file=str(output_file)))
+
+    callback.v2_playbook_on_stats(None)
+
+    assert callback._display.lines == []
+    assert not output_file.exists()
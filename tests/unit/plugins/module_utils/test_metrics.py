@@ -0,0 +1,70 @@
+import pytest
+
+from ansible_collections.ceesios.minio.plugins.module_utils.metrics import MAX_ENTITIES, MetricsRecorder
+
+
+class Client:
+    def user_info(self, access_key):
+        return '{}'
+
+    def get_object_retention(self, bucket_name, object_name):
+        return None
+
+    def update_service_account(self, *, access_key, status=None):
+        return ''
+
+    def add_service_account(self, *, access_key=None, name=None):
+        return ''
+
+    def group_add(self, group_name, members):
+        return ''
+
+    def list_buckets(self):
+        raise ValueError('broken')
+
+
+def test_counts_calls_and_errors_per_operation():
+    metrics = MetricsRecorder('minio_test')
+    client = metrics.wrap(Client())
+
+    client.user_info('alice')
+    client.user_info('bob')
+    with pytest.raises(ValueError):
+        client.list_buckets()
+
+    calls = metrics.data['calls']
+    assert calls['user_info']['count'] == 2
+    assert calls['user_info']['errors'] == 0
+    assert calls['list_buckets'] == dict(calls['list_buckets'], count=1, errors=1)
+
+
+def test_entities_per_kind_of_call():
+    metrics = MetricsRecorder('minio_test')
+    client = metrics.wrap(Client())
+
+    client.user_info('alice')
+    client.get_object_retention('vault', 'data/0001')
+    client.update_service_account(access_key='KEY1', status='off')
+    client.add_service_account(name='billing')
+    client.group_add('team', ['alice'])
+
+    assert sorted(metrics.data['entities']) == ['KEY1', 'alice', 'billing', 'team', 'vault/data/0001']
+
+
+def test_entities_are_bounded():
+    metrics = MetricsRecorder('minio_test')
+    client = metrics.wrap(Client())
+
+    for i in range(MAX_ENTITIES * 2):
+        client.user_info('user%d' % i)
+
+    assert len(metrics.data['entities']) == MAX_ENTITIES
+
+
+def test_set_items():
+    metrics = MetricsRecorder('minio_test')
+
+    metrics.set_items(10, 3)
+
+    assert metrics.data['items'] == 10
+    assert metrics.data['changed_items'] == 3
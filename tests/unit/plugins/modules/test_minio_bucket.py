@@ -0,0 +1,142 @@
+from ansible_collections.ceesios.minio.plugins.modules import minio_bucket
+
+
+def buckets(count, **settings):
+    return [dict(name='tenant-%03d' % i, **settings) for i in range(count)]
+
+
+def test_create(run, cluster):
+    result = run(minio_bucket, dict(buckets=buckets(10, quota=1024, tags={'tier': 'gold'})))
+
+    assert result['changed']
+    # Newly created buckets are never read back
+    assert cluster.reads() == [('list_buckets', ())]
+    assert sorted(set(cluster.operations()[1:])) == ['bucket_quota_set', 'make_bucket', 'set_bucket_tags']
+    assert len(cluster.writes()) == 30
+
+
+def test_noop_converge(run, cluster):
+    run(minio_bucket, dict(buckets=buckets(10, versioning='enabled', quota=1024, tags={'tier': 'gold'})))
+
+    result = run(minio_bucket, dict(buckets=buckets(10, versioning='enabled', quota=1024, tags={'tier': 'gold'})))
+
+    assert not result['changed']
+    # One listing plus one read per managed setting
+    assert len(cluster.reads()) == 1 + 10 * 3
+    assert cluster.writes() == []
+
+
+def test_existing_without_settings_costs_one_listing(run, cluster):
+    run(minio_bucket, dict(buckets=buckets(10)))
+
+    result = run(minio_bucket, dict(buckets=buckets(10)))
+
+    assert not result['changed']
+    assert cluster.operations() == ['list_buckets']
+
+
+def test_update_only_changed_setting(run, cluster):
+    run(minio_bucket, dict(buckets=buckets(2, quota=1024, tags={'tier': 'gold'})))
+
+    result = run(minio_bucket, dict(buckets=[
+        dict(name='tenant-000', quota=1024, tags={'tier': 'silver'}),
+        dict(name='tenant-001', quota=1024, tags={'tier': 'gold'}),
+    ]))
+
+    assert result['changed']
+    assert cluster.writes() == [('set_bucket_tags', ('tenant-000',))]
+
+
+def test_delete(run, cluster):
+    cluster.add_bucket('tenant-000')
+
+    result = run(minio_bucket, dict(state='absent', buckets=buckets(2)))
+
+    assert result['changed']
+    assert cluster.operations() == ['list_buckets', 'remove_bucket']
+
+
+def test_check_mode(run, cluster):
+    result = run(minio_bucket, dict(buckets=buckets(5, quota=1024)), check_mode=True)
+
+    assert result['changed']
+    assert cluster.writes() == []
+
+
+def test_plan_then_apply_reads_only_touched_buckets(run, cluster, tmp_path):
+    plan_file = str(tmp_path / 'buckets.plan')
+    run(minio_bucket, dict(buckets=buckets(10, quota=1024)))
+    desired = buckets(12, quota=1024)
+    desired[0]['quota'] = 2048
+
+    result = run(minio_bucket, dict(buckets=desired, plan_file=plan_file), check_mode=True)
+    assert result['plan']['operations'] == 3
+    assert cluster.writes() == []
+
+    result = run(minio_bucket, dict(buckets=desired, plan_file=plan_file))
+    assert result['changed']
+    assert result['plan']['applied']
+    # No listing and no reads of the nine untouched buckets
+    assert sorted(cluster.reads()) == [
+        ('bucket_exists', ('tenant-010',)),
+        ('bucket_exists', ('tenant-011',)),
+        ('bucket_quota_get', ('tenant-000',)),
+    ]
+    assert sorted(cluster.writes()) == [
+        ('bucket_quota_set', ('tenant-000',)),
+        ('bucket_quota_set', ('tenant-010',)),
+        ('bucket_quota_set', ('tenant-011',)),
+        ('make_bucket', ('tenant-010',)),
+        ('make_bucket', ('tenant-011',)),
+    ]
+    assert cluster.buckets['tenant-000']['quota'] == 2048
+
+    result = run(minio_bucket, dict(buckets=desired, plan_file=plan_file))
+    assert not result['changed']
+    assert cluster.calls == []
+
+
+def test_apply_stale_plan_fails_without_writes(run, cluster, tmp_path):
+    plan_file = str(tmp_path / 'buckets.plan')
+    cluster.add_bucket('tenant-000', quota=1024)
+    run(minio_bucket, dict(buckets=buckets(1, quota=2048), plan_file=plan_file), check_mode=True)
+    cluster.buckets['tenant-000']['quota'] = 4096
+
+    result = run(minio_bucket, dict(buckets=buckets(1, quota=2048), plan_file=plan_file), expect_failure=True)
+
+    assert 'tenant-000' in result['msg']
+    assert cluster.writes() == []
+
+
+def test_apply_plan_for_other_parameters_fails(run, cluster, tmp_path):
+    plan_file = str(tmp_path / 'buckets.plan')
+    run(minio_bucket, dict(buckets=buckets(2), plan_file=plan_file), check_mode=True)
+
+    result = run(minio_bucket, dict(buckets=buckets(3), plan_file=plan_file), expect_failure=True)
+
+    assert 'different task parameters' in result['msg']
+    assert cluster.calls == []
+
+
+def test_bucket_without_quota_config_counts_as_zero(run, cluster):
+    cluster.add_bucket('tenant-000', quota=None)
+    cluster.add_bucket('tenant-001', quota='null')
+
+    result = run(minio_bucket, dict(buckets=buckets(2, quota=0)))
+
+    assert not result['changed']
+    assert cluster.writes() == []
+
+    result = run(minio_bucket, dict(buckets=buckets(2, quota=1024)))
+
+    assert result['changed']
+    assert sorted(cluster.writes()) == [('bucket_quota_set', ('tenant-000',)), ('bucket_quota_set', ('tenant-001',))]
+
+
+def test_unwritable_progress_file_fails_cleanly(run, cluster, tmp_path):
+    progress_file = tmp_path / 'missing' / 'progress.json'
+
+    result = run(minio_bucket, dict(buckets=buckets(2), progress_file=str(progress_file)), expect_failure=True)
+
+    assert result['msg'].startswith('Failed to write')
+    assert cluster.writes() == []
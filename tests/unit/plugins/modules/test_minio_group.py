@@ -0,0 +1,117 @@
+from ansible_collections.ceesios.minio.plugins.modules import minio_group
+
+
+def group_args(**kwargs):
+    args = dict(state='present', group_name='team', users=['alice', 'bob'])
+    args.update(kwargs)
+    return args
+
+
+def add_group(cluster, members=('alice', 'bob'), status='enabled'):
+    cluster.groups['team'] = {'status': status, 'members': set(members), 'policies': set()}
+
+
+def test_create(run, cluster):
+    result = run(minio_group, group_args())
+
+    assert result['changed']
+    assert cluster.operations() == ['group_info', 'group_add']
+
+
+def test_noop_converge(run, cluster):
+    add_group(cluster)
+
+    result = run(minio_group, group_args())
+
+    assert not result['changed']
+    assert cluster.operations() == ['group_info']
+
+
+def test_update_members(run, cluster):
+    add_group(cluster)
+
+    result = run(minio_group, group_args(users=['alice', 'carol']))
+
+    assert result['changed']
+    assert len(cluster.reads()) == 1
+    assert sorted(cluster.operations()[1:]) == ['group_add', 'group_remove']
+    assert cluster.groups['team']['members'] == set(['alice', 'carol'])
+
+
+def test_delete(run, cluster):
+    add_group(cluster)
+
+    result = run(minio_group, dict(state='absent', group_name='team'))
+
+    assert result['changed']
+    assert cluster.operations() == ['group_info', 'group_remove']
+
+
+def test_check_mode(run, cluster):
+    add_group(cluster)
+
+    result = run(minio_group, group_args(users=['carol']), check_mode=True)
+
+    assert result['changed']
+    assert cluster.writes() == []
+
+
+def test_attach_and_detach_policies_with_one_call_each(run, cluster):
+    add_group(cluster)
+    cluster.groups['team']['policies'] = set(['readonly', 'diagnostics'])
+
+    result = run(minio_group, group_args(policies=['readonly', 'readwrite', 'consoleAdmin']))
+
+    assert result['changed']
+    assert cluster.operations() == ['group_info', 'attach_policy', 'detach_policy']
+    assert cluster.groups['team']['policies'] == set(['readonly', 'readwrite', 'consoleAdmin'])
+
+
+def test_policies_noop_converge(run, cluster):
+    add_group(cluster)
+    cluster.groups['team']['policies'] = set(['readonly', 'diagnostics'])
+
+    result = run(minio_group, group_args(policies=['diagnostics', 'readonly']))
+
+    assert not result['changed']
+    assert cluster.operations() == ['group_info']
+
+
+def test_disable(run, cluster):
+    add_group(cluster)
+
+    result = run(minio_group, group_args(state='disabled'))
+
+    assert result['changed']
+    assert cluster.operations() == ['group_info', 'group_disable']
+    assert cluster.groups['team']['status'] == 'disabled'
+
+
+def test_disabled_noop_converge(run, cluster):
+    add_group(cluster, status='disabled')
+
+    result = run(minio_group, group_args(state='disabled'))
+
+    assert not result['changed']
+    assert cluster.operations() == ['group_info']
+
+
+def test_full_converge_in_one_read(run, cluster):
+    add_group(cluster, status='disabled')
+    cluster.groups['team']['policies'] = set(['diagnostics'])
+
+    result = run(minio_group, group_args(users=['alice', 'carol'], policies=['readonly']))
+
+    assert result['changed']
+    assert len(cluster.reads()) == 1
+    assert sorted(cluster.operations()[1:]) == [
+        'attach_policy', 'detach_policy', 'group_add', 'group_enable', 'group_remove']
+    assert cluster.groups['team'] == {
+        'status': 'enabled', 'members': set(['alice', 'carol']), 'policies': set(['readonly'])}
+
+
+def test_create_disabled_with_policies(run, cluster):
+    result = run(minio_group, group_args(state='disabled', policies=['readonly']))
+
+    assert result['changed']
+    assert cluster.operations() == ['group_info', 'group_add', 'attach_policy', 'group_disable']
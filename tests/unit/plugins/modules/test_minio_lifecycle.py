@@ -0,0 +1,118 @@
+from ansible_collections.ceesios.minio.plugins.modules import minio_lifecycle
+
+RULES = [
+    dict(id='expire-tmp', prefix='tmp/', expiration_days=7),
+    dict(id='expire-noncurrent', noncurrent_expiration_days=30),
+]
+
+
+def add_buckets(cluster, count):
+    names = ['tenant-%03d' % i for i in range(count)]
+    for name in names:
+        cluster.add_bucket(name)
+    return names
+
+
+def test_create(run, cluster):
+    add_buckets(cluster, 1)
+
+    result = run(minio_lifecycle, dict(bucket_name='tenant-000', rules=RULES))
+
+    assert result['changed']
+    assert cluster.operations() == ['get_bucket_lifecycle', 'set_bucket_lifecycle']
+
+
+def test_noop_converge_is_order_insensitive(run, cluster):
+    names = add_buckets(cluster, 10)
+    run(minio_lifecycle, dict(buckets=names, rules=RULES))
+
+    result = run(minio_lifecycle, dict(buckets=names, rules=list(reversed(RULES))))
+
+    assert not result['changed']
+    assert len(cluster.reads()) == 10
+    assert cluster.writes() == []
+
+
+def test_update(run, cluster):
+    names = add_buckets(cluster, 10)
+    run(minio_lifecycle, dict(buckets=names, rules=RULES))
+
+    result = run(minio_lifecycle, dict(buckets=names, rules=[dict(id='expire-tmp', prefix='tmp/', expiration_days=1)]))
+
+    assert result['changed']
+    assert len(cluster.reads()) == 10
+    assert len(cluster.writes()) == 10
+
+
+def test_delete(run, cluster):
+    add_buckets(cluster, 1)
+    run(minio_lifecycle, dict(bucket_name='tenant-000', rules=RULES))
+
+    result = run(minio_lifecycle, dict(state='absent', bucket_name='tenant-000'))
+
+    assert result['changed']
+    assert cluster.operations() == ['get_bucket_lifecycle', 'delete_bucket_lifecycle']
+
+
+def test_check_mode(run, cluster):
+    names = add_buckets(cluster, 3)
+
+    result = run(minio_lifecycle, dict(buckets=names, rules=RULES), check_mode=True)
+
+    assert result['changed']
+    assert cluster.writes() == []
+
+
+def test_plan_then_apply_reads_only_touched_buckets(run, cluster, tmp_path):
+    plan_file = str(tmp_path / 'lifecycle.plan')
+    names = add_buckets(cluster, 10)
+    run(minio_lifecycle, dict(buckets=names[:7], rules=RULES))
+
+    result = run(minio_lifecycle, dict(buckets=names, rules=RULES, plan_file=plan_file), check_mode=True)
+    assert result['plan']['operations'] == 3
+    assert cluster.writes() == []
+
+    result = run(minio_lifecycle, dict(buckets=names, rules=RULES, plan_file=plan_file))
+    assert result['changed']
+    assert len(cluster.reads()) == 3
+    assert sorted(cluster.writes()) == [('set_bucket_lifecycle', (name,)) for name in names[7:]]
+
+    result = run(minio_lifecycle, dict(buckets=names, rules=RULES, plan_file=plan_file))
+    assert not result['changed']
+    assert cluster.calls == []
+
+
+def test_apply_stale_plan_fails_without_writes(run, cluster, tmp_path):
+    plan_file = str(tmp_path / 'lifecycle.plan')
+    add_buckets(cluster, 1)
+    run(minio_lifecycle, dict(bucket_name='tenant-000', rules=RULES, plan_file=plan_file), check_mode=True)
+    run(minio_lifecycle, dict(bucket_name='tenant-000', rules=RULES[:1]))
+
+    result = run(minio_lifecycle, dict(bucket_name='tenant-000', rules=RULES, plan_file=plan_file), expect_failure=True)
+
+    assert 'tenant-000' in result['msg']
+    assert cluster.writes() == []
+
+
+def test_apply_fails_cleanly_when_verification_read_fails(run, cluster, tmp_path):
+    plan_file = str(tmp_path / 'lifecycle.plan')
+    add_buckets(cluster, 1)
+    run(minio_lifecycle, dict(bucket_name='tenant-000', rules=RULES, plan_file=plan_file), check_mode=True)
+    del cluster.buckets['tenant-000']
+
+    result = run(minio_lifecycle, dict(bucket_name='tenant-000', rules=RULES, plan_file=plan_file), expect_failure=True)
+
+    assert 'Failed to verify plan' in result['msg']
+    assert result['error_code'] == 'NoSuchBucket'
+    assert cluster.writes() == []
+
+
+def test_unwritable_progress_file_fails_cleanly(run, cluster, tmp_path):
+    names = add_buckets(cluster, 2)
+    progress_file = tmp_path / 'missing' / 'progress.json'
+
+    result = run(minio_lifecycle, dict(buckets=names, rules=RULES, progress_file=str(progress_file)),
+                 expect_failure=True)
+
+    assert result['msg'].startswith('Failed to write')
+    assert cluster.writes() == []
@@ -0,0 +1,79 @@
+import json
+
+from ansible_collections.ceesios.minio.plugins.modules import minio_policy
+
+STATEMENTS = [dict(Effect='Allow', Action=['s3:GetObject'], Resource=['arn:aws:s3:::bucket/*'])]
+
+
+def policy_args(**kwargs):
+    args = dict(state='present', policy_name='read', statements=STATEMENTS)
+    args.update(kwargs)
+    return args
+
+
+def add_policy(cluster, users=(), groups=()):
+    cluster.policies['read'] = json.loads(json.dumps({'Version': '2012-10-17', 'Statement': STATEMENTS}))
+    cluster.policy_users['read'] = set(users)
+    cluster.policy_groups['read'] = set(groups)
+
+
+def test_create(run, cluster):
+    result = run(minio_policy, policy_args())
+
+    assert result['changed']
+    assert cluster.operations() == ['policy_info', 'policy_add']
+
+
+def test_noop_converge(run, cluster):
+    add_policy(cluster)
+
+    result = run(minio_policy, policy_args())
+
+    assert not result['changed']
+    assert cluster.operations() == ['policy_info']
+
+
+def test_noop_converge_with_attachments(run, cluster):
+    add_policy(cluster, users=['alice', 'bob'], groups=['team'])
+
+    result = run(minio_policy, policy_args(users=['alice', 'bob'], groups=['team']))
+
+    assert not result['changed']
+    assert cluster.operations() == ['policy_info', 'get_policy_entities']
+
+
+def test_attach_only_missing(run, cluster):
+    add_policy(cluster, users=['alice'])
+
+    result = run(minio_policy, policy_args(users=['alice', 'bob']))
+
+    assert result['changed']
+    assert cluster.writes() == [('policy_set', ('read',))]
+
+
+def test_update(run, cluster):
+    add_policy(cluster)
+    statements = [dict(Effect='Allow', Action=['s3:PutObject'], Resource=['arn:aws:s3:::bucket/*'])]
+
+    result = run(minio_policy, policy_args(statements=statements))
+
+    assert result['changed']
+    assert cluster.operations() == ['policy_info', 'policy_add']
+
+
+def test_delete(run, cluster):
+    add_policy(cluster)
+
+    result = run(minio_policy, dict(state='absent', policy_name='read'))
+
+    assert result['changed']
+    assert cluster.operations() == ['policy_info', 'policy_remove']
+
+
+def test_check_mode(run, cluster):
+    add_policy(cluster)
+
+    result = run(minio_policy, policy_args(users=['alice'], statements=[]), check_mode=True)
+
+    assert result['changed']
+    assert cluster.writes() == []
@@ -0,0 +1,170 @@
+import json
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from minio.commonconfig import COMPLIANCE
+from minio.objectlockconfig import ObjectLockConfig, DAYS
+from minio.retention import Retention
+from urllib3.exceptions import ProtocolError
+
+from ansible_collections.ceesios.minio.plugins.modules import minio_retention
+
+LAST_MODIFIED = datetime.now(timezone.utc) - timedelta(days=1)
+EXPIRED = datetime.now(timezone.utc) - timedelta(days=365)
+
+
+def retention_args(**kwargs):
+    args = dict(state='present', bucket_name='vault', retention_mode='GOVERNANCE', retention_days=30)
+    args.update(kwargs)
+    return args
+
+
+def add_objects(cluster, count, last_modified=LAST_MODIFIED):
+    bucket = cluster.buckets.get('vault') or cluster.add_bucket('vault', object_lock=True)
+    for i in range(len(bucket['objects']), len(bucket['objects']) + count):
+        bucket['objects']['data/%04d' % i] = {'last_modified': last_modified}
+    return bucket
+
+
+def test_set_bucket_retention(run, cluster):
+    cluster.add_bucket('vault', object_lock=True)
+
+    result = run(minio_retention, retention_args())
+
+    assert result['changed']
+    assert cluster.operations() == ['get_object_lock_config', 'set_object_lock_config']
+
+
+def test_bucket_noop_converge(run, cluster):
+    bucket = cluster.add_bucket('vault', object_lock=True)
+    bucket['lock_config'] = ObjectLockConfig('GOVERNANCE', 30, DAYS)
+
+    result = run(minio_retention, retention_args())
+
+    assert not result['changed']
+    assert cluster.operations() == ['get_object_lock_config']
+
+
+def test_remove_bucket_retention(run, cluster):
+    bucket = cluster.add_bucket('vault', object_lock=True)
+    bucket['lock_config'] = ObjectLockConfig('GOVERNANCE', 30, DAYS)
+
+    result = run(minio_retention, dict(state='absent', bucket_name='vault'))
+
+    assert result['changed']
+    assert cluster.operations() == ['get_object_lock_config', 'set_object_lock_config']
+
+
+def test_objects_backfill(run, cluster):
+    add_objects(cluster, 25)
+
+    result = run(minio_retention, retention_args(scope='objects', prefix='data/'))
+
+    assert result['objects_changed'] == 25
+    assert len(cluster.reads()) == 1 + 25
+    assert len(cluster.writes()) == 25
+
+
+def test_objects_noop_converge(run, cluster):
+    add_objects(cluster, 25)
+    run(minio_retention, retention_args(scope='objects', prefix='data/', legal_hold=True))
+
+    result = run(minio_retention, retention_args(scope='objects', prefix='data/', legal_hold=True))
+
+    assert not result['changed']
+    # One listing plus one retention and one legal hold read per object
+    assert len(cluster.reads()) == 1 + 2 * 25
+    assert cluster.writes() == []
+
+
+def test_objects_noop_converge_with_subsecond_last_modified(run, cluster):
+    add_objects(cluster, 3, last_modified=LAST_MODIFIED.replace(microsecond=123456))
+    run(minio_retention, retention_args(scope='objects', prefix='data/'))
+
+    result = run(minio_retention, retention_args(scope='objects', prefix='data/'))
+
+    assert not result['changed']
+    assert cluster.writes() == []
+
+
+def test_objects_resume_from_checkpoint(run, cluster, tmp_path):
+    add_objects(cluster, 25)
+    checkpoint = tmp_path / 'checkpoint'
+    checkpoint.write_text('{"bucket": "vault", "prefix": "data/", "start_after": "data/0019"}')
+
+    result = run(minio_retention, retention_args(scope='objects', prefix='data/', checkpoint_file=str(checkpoint)))
+
+    assert result['resumed_after'] == 'data/0019'
+    assert result['objects_scanned'] == 5
+    assert len(cluster.writes()) == 5
+    assert not checkpoint.exists()
+
+
+def test_objects_check_mode(run, cluster):
+    add_objects(cluster, 5)
+
+    result = run(minio_retention, retention_args(scope='objects'), check_mode=True)
+
+    assert result['changed']
+    assert cluster.writes() == []
+
+
+def test_objects_with_elapsed_retention_are_skipped(run, cluster, tmp_path):
+    add_objects(cluster, 5, last_modified=EXPIRED)
+    add_objects(cluster, 5)
+    checkpoint = tmp_path / 'checkpoint'
+
+    result = run(minio_retention, retention_args(scope='objects', checkpoint_file=str(checkpoint)))
+
+    assert result['objects_expired'] == 5
+    assert result['objects_changed'] == 5
+    assert result['objects_failed'] == 0
+    # Expired objects are not even read
+    assert len(cluster.reads()) == 1 + 5
+    assert not checkpoint.exists()
+
+
+def test_elapsed_retention_still_applies_legal_hold(run, cluster):
+    add_objects(cluster, 3, last_modified=EXPIRED)
+
+    result = run(minio_retention, retention_args(scope='objects', legal_hold=True))
+
+    assert result['objects_expired'] == 3
+    assert [call[0] for call in cluster.writes()] == ['enable_object_legal_hold'] * 3
+
+
+def test_anchor_now_retains_old_objects_once(run, cluster):
+    add_objects(cluster, 5, last_modified=EXPIRED)
+
+    result = run(minio_retention, retention_args(scope='objects', retention_anchor='now'))
+    assert result['objects_changed'] == 5
+    assert result['objects_expired'] == 0
+
+    result = run(minio_retention, retention_args(scope='objects', retention_anchor='now'))
+    assert not result['changed']
+    assert cluster.writes() == []
+
+
+def test_compliance_objects_are_not_weakened(run, cluster):
+    bucket = add_objects(cluster, 2)
+    retain_until = datetime.now(timezone.utc) + timedelta(days=1)
+    bucket['objects']['data/0000']['retention'] = Retention(COMPLIANCE, retain_until)
+
+    result = run(minio_retention, retention_args(scope='objects'))
+
+    assert result['objects_failed'] == 0
+    assert cluster.writes() == [('set_object_retention', ('vault',))]
+    assert bucket['objects']['data/0000']['retention'].mode == COMPLIANCE
+
+
+def test_objects_marks_progress_failed_on_unexpected_error(run, cluster, tmp_path):
+    add_objects(cluster, 3)
+    progress_file = tmp_path / 'progress.json'
+    cluster.failures['get_object_retention'] = ProtocolError('connection reset')
+
+    with pytest.raises(ProtocolError):
+        run(minio_retention, retention_args(scope='objects', progress_file=str(progress_file)))
+
+    assert json.loads(progress_file.read_text())['state'] == 'failed'
@@ -0,0 +1,160 @@
+from ansible_collections.ceesios.minio.plugins.modules import minio_service_account
+
+STATEMENTS = [dict(Effect='Allow', Action=['s3:PutObject', 's3:GetObject'], Resource=['arn:aws:s3:::app/*'])]
+POLICY = {'Version': '2012-10-17', 'Statement': [
+    dict(Effect='Allow', Action=['s3:GetObject', 's3:PutObject'], Resource=['arn:aws:s3:::app/*'])]}
+
+
+def accounts(count, **settings):
+    return [dict(name='app%03d' % i, **settings) for i in range(count)]
+
+
+def test_create_returns_generated_credentials(run, cluster):
+    result = run(minio_service_account, dict(service_accounts=accounts(20, statements=STATEMENTS)))
+
+    assert result['changed']
+    assert cluster.reads() == [('list_service_account', ('admin',))]
+    assert len(cluster.writes()) == 20
+    assert len(result['credentials']) == 20
+    credential = result['credentials'][0]
+    assert credential['secret_key'] == cluster.service_accounts[credential['access_key']]['secret_key']
+    assert all(account['policy'] == POLICY for account in cluster.service_accounts.values())
+
+
+def test_noop_converge_uses_one_listing(run, cluster):
+    run(minio_service_account, dict(service_accounts=accounts(20, description='app')))
+
+    result = run(minio_service_account, dict(service_accounts=accounts(20, description='app')))
+
+    assert not result['changed']
+    assert result['credentials'] == []
+    assert cluster.operations() == ['list_service_account']
+
+
+def test_noop_converge_with_policy_reads_each_policy_once(run, cluster):
+    run(minio_service_account, dict(service_accounts=accounts(5, statements=STATEMENTS)))
+
+    result = run(minio_service_account, dict(service_accounts=accounts(5, statements=STATEMENTS)))
+
+    assert not result['changed']
+    assert len(cluster.reads()) == 1 + 5
+    assert cluster.writes() == []
+
+
+def test_update_only_changed_accounts(run, cluster):
+    cluster.add_service_account('KEY1', 'app000', policy=POLICY)
+    cluster.add_service_account('KEY2', 'app001', policy=POLICY)
+    desired = accounts(2, statements=STATEMENTS)
+    desired[1]['status'] = 'disabled'
+
+    result = run(minio_service_account, dict(service_accounts=desired))
+
+    assert result['changed']
+    assert cluster.writes() == [('update_service_account', ('KEY2',))]
+    assert cluster.service_accounts['KEY2']['status'] == 'off'
+    assert result['credentials'] == []
+
+
+def test_create_with_fixed_keys_and_disabled(run, cluster):
+    result = run(minio_service_account, dict(service_accounts=[
+        dict(name='reports', access_key='reports-reader', secret_key='reports-secret', status='disabled')]))
+
+    assert result['changed']
+    assert cluster.writes() == [('add_service_account', ('reports-reader',))]
+    assert cluster.service_accounts['reports-reader']['status'] == 'off'
+    assert result['credentials'][0]['access_key'] == 'reports-reader'
+
+
+def test_empty_description_is_not_managed(run, cluster):
+    cluster.add_service_account('KEY1', 'app000', description='old')
+
+    result = run(minio_service_account, dict(service_accounts=accounts(1, description='')))
+
+    assert not result['changed']
+    assert cluster.writes() == []
+    assert cluster.service_accounts['KEY1']['description'] == 'old'
+
+
+def test_prune_unmanaged(run, cluster):
+    cluster.add_service_account('KEY1', 'app000')
+    cluster.add_service_account('KEY2', 'legacy')
+    cluster.add_service_account('KEY3', 'other', parent='someone-else')
+
+    result = run(minio_service_account, dict(service_accounts=accounts(1), prune=True))
+
+    assert result['changed']
+    assert cluster.operations() == ['list_service_account', 'delete_service_account']
+    assert sorted(cluster.service_accounts) == ['KEY1', 'KEY3']
+
+
+def test_delete(run, cluster):
+    cluster.add_service_account('KEY1', 'app000')
+
+    result = run(minio_service_account, dict(state='absent', service_accounts=accounts(2)))
+
+    assert result['changed']
+    assert cluster.operations() == ['list_service_account', 'delete_service_account']
+
+
+def test_create_for_other_parent_fails(run, cluster):
+    result = run(minio_service_account, dict(service_accounts=accounts(1, parent_user='app_owner')),
+                 expect_failure=True)
+
+    assert 'authenticated user' in result['msg']
+    assert cluster.writes() == []
+
+
+def test_check_mode(run, cluster):
+    cluster.add_service_account('KEY1', 'legacy')
+
+    result = run(minio_service_account, dict(service_accounts=accounts(5), prune=True), check_mode=True)
+
+    assert result['changed']
+    assert cluster.writes() == []
+    assert result['credentials'] == []
+
+
+def test_secret_key_requires_access_key(run, cluster):
+    result = run(minio_service_account, dict(service_accounts=[dict(name='app', secret_key='secret')]),
+                 expect_failure=True)
+
+    assert 'access_key' in result['msg']
+    assert cluster.calls == []
+
+
+def test_ambiguous_name_blocks_prune(run, cluster):
+    cluster.add_service_account('KEY1', 'billing')
+    cluster.add_service_account('KEY2', 'billing')
+    cluster.add_service_account('KEY3', 'legacy')
+
+    result = run(minio_service_account, dict(service_accounts=[dict(name='billing')], prune=True),
+                 expect_failure=True)
+
+    assert '2 service accounts named billing' in result['msg']
+    assert cluster.writes() == []
+    assert sorted(cluster.service_accounts) == ['KEY1', 'KEY2', 'KEY3']
+
+
+def test_name_matching_fails_without_names_in_listing(run, cluster):
+    cluster.service_account_names = False
+    cluster.add_service_account('KEY1', 'billing')
+    cluster.add_service_account('KEY2', 'legacy')
+
+    result = run(minio_service_account, dict(service_accounts=[
+        dict(name='billing'), dict(name='legacy', access_key='KEY2', status='disabled')], prune=True),
+        expect_failure=True)
+
+    assert 'does not list service account names' in result['msg']
+    # Accounts matched by access key are still converged, but nothing is created or pruned
+    assert cluster.writes() == [('update_service_account', ('KEY2',))]
+    assert sorted(cluster.service_accounts) == ['KEY1', 'KEY2']
+
+
+def test_unwritable_progress_file_fails_cleanly(run, cluster, tmp_path):
+    progress_file = tmp_path / 'missing' / 'progress.json'
+
+    result = run(minio_service_account, dict(service_accounts=accounts(2), progress_file=str(progress_file)),
+                 expect_failure=True)
+
+    assert result['msg'].startswith('Failed to write')
+    assert cluster.writes() == []
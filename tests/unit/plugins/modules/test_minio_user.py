@@ -0,0 +1,122 @@
+import json
+
+from ansible_collections.ceesios.minio.plugins.modules import minio_user
+
+
+def user_args(**kwargs):
+    args = dict(state='present', user_access_key='app', user_secret_key='app-secret')
+    args.update(kwargs)
+    return args
+
+
+def test_create(run, cluster):
+    result = run(minio_user, user_args())
+
+    assert result['changed']
+    assert cluster.operations() == ['user_info', 'user_add']
+
+
+def test_noop_converge(run, cluster):
+    cluster.users['app'] = {'secretKey': 'app-secret', 'status': 'enabled'}
+
+    result = run(minio_user, user_args())
+
+    assert not result['changed']
+    assert len(cluster.reads()) == 1
+    assert cluster.writes() == []
+
+
+def test_rotate_secret_only_when_changed(run, cluster, tmp_path):
+    fingerprints = str(tmp_path / 'secrets.json')
+    run(minio_user, user_args(secret_fingerprint_file=fingerprints))
+
+    result = run(minio_user, user_args(secret_fingerprint_file=fingerprints))
+    assert not result['changed']
+    assert cluster.operations() == ['user_info']
+
+    result = run(minio_user, user_args(user_secret_key='rotated', secret_fingerprint_file=fingerprints))
+    assert result['changed']
+    assert cluster.operations() == ['user_info', 'user_add']
+    assert cluster.users['app']['secretKey'] == 'rotated'
+
+
+def test_tracked_secret_requires_secret_key(run, cluster, tmp_path):
+    cluster.users['app'] = {'secretKey': 'app-secret', 'status': 'enabled'}
+
+    result = run(minio_user, dict(state='present', user_access_key='app',
+                                  secret_fingerprint_file=str(tmp_path / 'secrets.json')), expect_failure=True)
+
+    assert 'user_secret_key is required' in result['msg']
+    assert cluster.operations() == []
+    assert cluster.users['app']['secretKey'] == 'app-secret'
+
+
+def test_disable(run, cluster):
+    cluster.users['app'] = {'secretKey': 'app-secret', 'status': 'enabled'}
+
+    result = run(minio_user, user_args(state='disabled'))
+
+    assert result['changed']
+    assert cluster.operations() == ['user_info', 'user_disable']
+
+
+def test_delete(run, cluster):
+    cluster.users['app'] = {'secretKey': 'app-secret', 'status': 'enabled'}
+
+    result = run(minio_user, dict(state='absent', user_access_key='app'))
+
+    assert result['changed']
+    assert cluster.operations() == ['user_info', 'user_remove']
+
+
+def test_check_mode(run, cluster):
+    result = run(minio_user, user_args(), check_mode=True)
+
+    assert result['changed']
+    assert cluster.writes() == []
+    assert cluster.users == {}
+
+
+def test_bulk_create_uses_one_listing(run, cluster):
+    users = [dict(access_key='app%d' % i, secret_key='secret%d' % i) for i in range(20)]
+
+    result = run(minio_user, dict(state='present', users=users, max_workers=4))
+
+    assert result['changed']
+    assert cluster.reads() == [('user_list', ())]
+    assert len(cluster.writes()) == 20
+
+
+def test_bulk_noop_converge(run, cluster, tmp_path):
+    fingerprints = str(tmp_path / 'secrets.json')
+    users = [dict(access_key='app%d' % i, secret_key='secret%d' % i) for i in range(20)]
+    run(minio_user, dict(state='present', users=users, secret_fingerprint_file=fingerprints))
+
+    result = run(minio_user, dict(state='present', users=users, secret_fingerprint_file=fingerprints))
+
+    assert not result['changed']
+    assert cluster.operations() == ['user_list']
+
+
+def test_bulk_rotates_only_changed_secrets(run, cluster, tmp_path):
+    fingerprints = str(tmp_path / 'secrets.json')
+    users = [dict(access_key='app%d' % i, secret_key='secret%d' % i) for i in range(20)]
+    run(minio_user, dict(state='present', users=users, secret_fingerprint_file=fingerprints))
+    users[3]['secret_key'] = 'rotated'
+
+    result = run(minio_user, dict(state='present', users=users, secret_fingerprint_file=fingerprints))
+
+    assert result['changed']
+    assert cluster.writes() == [('user_add', ('app3',))]
+
+
+def test_bulk_marks_progress_failed_when_fingerprints_can_not_be_written(run, cluster, tmp_path):
+    progress_file = tmp_path / 'progress.json'
+    fingerprints = str(tmp_path / 'missing-directory' / 'secrets.json')
+    users = [dict(access_key='app%d' % i, secret_key='secret%d' % i) for i in range(3)]
+
+    result = run(minio_user, dict(state='present', users=users, secret_fingerprint_file=fingerprints,
+                                  progress_file=str(progress_file)), expect_failure=True)
+
+    assert 'Failed to write' in result['msg']
+    assert json.loads(progress_file.read_text())['state'] == 'failed'